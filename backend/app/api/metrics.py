@@ -0,0 +1,209 @@
+import hmac
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse
+
+from ..core.admission import load_shedder, rate_limiter
+from ..core.config import get_settings
+from ..core.db import engine
+from ..core.metrics import (
+    REQUEST_DB_QUERIES,
+    REQUEST_DB_TIME,
+    REQUEST_LATENCY,
+    RequestDbStats,
+    channel_type,
+    loop_lag_monitor,
+    profiler,
+    registry,
+    request_db_stats,
+)
+from ..core.security import password_hasher
+from ..events.bus import ws_manager
+from ..services.audit import audit_writer
+from ..services.outbox import outbox_dispatcher
+from ..services.principal_cache import principal_cache
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+settings = get_settings()
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+async def track_request(request: Request, call_next):
+    stats = RequestDbStats()
+    token = request_db_stats.set(stats)
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        request_db_stats.reset(token)
+        route = request.scope.get("route")
+        # Label by template, never the raw path, so ids and slugs do not explode cardinality.
+        path = getattr(route, "path", "unmatched")
+        REQUEST_LATENCY.observe(time.perf_counter() - started, method=request.method, route=path, status=str(status_code))
+        REQUEST_DB_TIME.observe(stats.seconds, method=request.method, route=path)
+        REQUEST_DB_QUERIES.observe(stats.queries, method=request.method, route=path)
+
+
+def _pool_state():
+    pool = engine.sync_engine.pool
+    for state in ("size", "checkedin", "checkedout", "overflow"):
+        reader = getattr(pool, state, None)
+        if callable(reader):
+            yield state, reader()
+
+
+def _ws_connections():
+    totals: dict[str, int] = {}
+    for connection in ws_manager.sockets:
+        kind = channel_type(connection.channel)
+        totals[kind] = totals.get(kind, 0) + 1
+    return totals.items()
+
+
+def _ws_subscriptions():
+    totals: dict[str, int] = {}
+    for channel, connections in ws_manager.connections.items():
+        kind = channel_type(channel)
+        totals[kind] = totals.get(kind, 0) + len(connections)
+    return totals.items()
+
+
+def _ws_counters():
+    for kind, counters in ws_manager.totals().items():
+        for outcome, value in vars(counters).items():
+            yield kind, outcome, value
+
+
+def _ws_coalescing():
+    if ws_manager.coalescer is None:
+        return
+    for kind, counters in ws_manager.coalescer.stats.items():
+        for field, value in vars(counters).items():
+            yield kind, field, value
+
+
+def _ws_queue_depth():
+    totals: dict[str, int] = {}
+    for connection in ws_manager.sockets:
+        kind = channel_type(connection.channel)
+        totals[kind] = totals.get(kind, 0) + len(connection.queue)
+    return totals.items()
+
+
+# Component stats() dicts mix current levels with running totals; split them by field
+# so each half is exported with the right TYPE.
+def _split(stats, gauge_fields):
+    def pick(counters: bool):
+        return lambda: [
+            (name, value)
+            for name, value in stats().items()
+            if isinstance(value, (int, float)) and (name in gauge_fields) != counters
+        ]
+
+    return pick(False), pick(True)
+
+
+audit_levels, audit_totals = _split(audit_writer.stats, {"queue_depth", "lag_seconds"})
+outbox_levels, outbox_totals = _split(outbox_dispatcher.stats, {"pending", "unmarked"})
+admission_levels, admission_totals = _split(
+    lambda: {**rate_limiter.stats(), **load_shedder.stats()}, {"tracked_keys"}
+)
+hasher_levels, hasher_totals = _split(password_hasher.stats, {"workers", "pending", "max_pending"})
+
+registry.gauge("todo_sync_db_pool_connections", "Connection pool state.", ("state",), _pool_state)
+registry.gauge(
+    "todo_sync_ws_connections", "Open WebSocket connections by the channel they were opened on.", ("channel_type",),
+    _ws_connections,
+)
+registry.gauge("todo_sync_ws_subscriptions", "Channel subscriptions held by open sockets.", ("channel_type",), _ws_subscriptions)
+registry.gauge("todo_sync_ws_send_queue_depth", "Events queued for WebSocket writers.", ("channel_type",), _ws_queue_depth)
+registry.counter(
+    "todo_sync_ws_messages_total", "WebSocket delivery outcomes (sent, dropped, failed, ...).",
+    ("channel_type", "outcome"), _ws_counters,
+)
+registry.counter(
+    "todo_sync_ws_coalesce_total", "Coalescing stage: events in, frames out, merged versions, socket frames saved.",
+    ("channel_type", "field"), _ws_coalescing,
+)
+registry.counter(
+    "todo_sync_ws_rejected_connections_total", "Sockets refused by the per-process or per-channel cap.", (),
+    lambda: [(ws_manager.rejected_connections,)],
+)
+registry.counter(
+    "todo_sync_ws_rejected_subscriptions_total", "Subscribe requests refused by a cap or failed authorization.", (),
+    lambda: [(ws_manager.rejected_subscriptions,)],
+)
+registry.gauge(
+    "todo_sync_event_loop_lag_max_seconds", "Largest event-loop lag seen since start.", (),
+    lambda: [(loop_lag_monitor.max_lag,)],
+)
+registry.gauge("todo_sync_audit_queue", "Buffered audit writer backlog.", ("field",), audit_levels)
+registry.counter("todo_sync_audit_rows_total", "Audit rows flushed, dropped or failed.", ("field",), audit_totals)
+registry.gauge("todo_sync_outbox", "Outbox events awaiting publish or marking.", ("field",), outbox_levels)
+registry.counter(
+    "todo_sync_outbox_events_total", "Outbox events dispatched, recovered, failed and pruned.", ("field",), outbox_totals
+)
+registry.counter(
+    "todo_sync_auth_total", "Principal resolution counters.", ("field",),
+    lambda: [(name, value) for name, value in vars(principal_cache.stats).items()],
+)
+registry.gauge("todo_sync_admission", "Rate limiter buckets tracked in process.", ("field",), admission_levels)
+registry.counter(
+    "todo_sync_admission_total", "Requests allowed, limited or shed, and bucket store errors.", ("field",),
+    admission_totals,
+)
+registry.gauge("todo_sync_password_hasher", "Password hashing pool state.", ("field",), hasher_levels)
+registry.counter(
+    "todo_sync_password_hashes_total", "Password hashes completed or rejected.", ("field",), hasher_totals
+)
+
+
+def _check_token(request: Request) -> None:
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(credentials.encode(), settings.metrics_token.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials", headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+# Both fail closed: without a metrics_token there is nothing to scrape.
+def require_metrics(request: Request) -> None:
+    if not settings.metrics_enabled or not settings.metrics_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    _check_token(request)
+
+
+def require_profiler(request: Request) -> None:
+    if not settings.profiler_allowed or not settings.metrics_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    _check_token(request)
+
+
+@router.get("", response_class=PlainTextResponse, include_in_schema=False, dependencies=[Depends(require_metrics)])
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/profiler", include_in_schema=False, dependencies=[Depends(require_profiler)])
+async def profiler_status():
+    return profiler.status()
+
+
+@router.post("/profiler", include_in_schema=False, dependencies=[Depends(require_profiler)])
+async def toggle_profiler(enabled: bool = Query(...), interval: float = Query(0.01, gt=0.0005, le=1.0)):
+    if enabled:
+        profiler.start(interval)
+    else:
+        profiler.stop()
+    return profiler.status()
+
+
+@router.get(
+    "/profiler/stacks", response_class=PlainTextResponse, include_in_schema=False, dependencies=[Depends(require_profiler)]
+)
+async def profiler_stacks(limit: int = Query(200, ge=1, le=5000)):
+    return PlainTextResponse(profiler.folded(limit))
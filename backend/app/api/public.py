@@ -1,89 +1,116 @@
-from datetime import date, timedelta
+from datetime import date
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, WebSocket, WebSocketException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..dependencies import get_db
+from ..core.conditional import etag_matches, make_etag, not_modified
+from ..core.config import get_settings
+from ..core.db import session_scope
+from ..dependencies import get_db, limit_public_reads, limit_public_writes
 from ..events.bus import ws_manager
-from ..models.user import ShareMode, User
+from ..models.user import ShareMode
 from ..schemas import todo as todo_schema
-from ..services.todo import TodoService
+from ..services.public_cache import PublicCalendar, public_cache
+from ..services.subscriptions import control_handler
+from ..services.todo import TodoService, check_range, month_bounds, todo_event
 
 router = APIRouter(prefix="/public", tags=["public"])
+settings = get_settings()
+PUBLIC_CACHE_CONTROL = f"public, max-age={settings.public_http_max_age_seconds}"
 
 
-def _get_user_by_slug(db: Session, slug: str) -> User:
-    user = db.execute(select(User).where(User.public_slug == slug)).scalar_one_or_none()
-    if not user or user.share_mode is ShareMode.PRIVATE:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Calendar not public")
-    return user
+async def _get_user_by_slug(db: AsyncSession, slug: str) -> PublicCalendar:
+    return await public_cache.get_calendar(db, slug)
 
 
-@router.get("/{slug}/todos", response_model=list[todo_schema.TodoResponse])
+@router.get("/{slug}/todos", response_model=list[todo_schema.TodoResponse], dependencies=[Depends(limit_public_reads)])
 async def list_public_todos(
     slug: str,
+    response: Response,
     target_date: date = Query(..., alias="date"),
-    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db, scope="function"),
 ):
-    user = _get_user_by_slug(db, slug)
+    user = await _get_user_by_slug(db, slug)
+    etag = make_etag(user.id, await public_cache.change_seq(db, user.id))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, PUBLIC_CACHE_CONTROL)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = PUBLIC_CACHE_CONTROL
+    return await public_cache.list_for_date(db, user.id, target_date)
+
+
+@router.get("/{slug}/todos/range", response_model=todo_schema.TodoPage, dependencies=[Depends(limit_public_reads)])
+async def list_public_todos_range(
+    slug: str,
+    first_day: date = Query(..., alias="from"),
+    last_day: date = Query(..., alias="to"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db, scope="function"),
+):
+    user = await _get_user_by_slug(db, slug)
+    check_range(first_day, last_day)
     service = TodoService(db)
-    todos = service.list_for_date(user.id, target_date)
-    return todos
+    todos, next_cursor = await service.list_range(user.id, first_day, last_day, limit, cursor)
+    return todo_schema.TodoPage(items=todos, next_cursor=next_cursor)
 
 
-@router.post("/{slug}/todos/{todo_id}/toggle", response_model=todo_schema.TodoResponse)
+@router.post(
+    "/{slug}/todos/{todo_id}/toggle",
+    response_model=todo_schema.TodoResponse,
+    dependencies=[Depends(limit_public_writes)],
+)
 async def toggle_public_todo(
     slug: str,
     todo_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     edit_token: Optional[str] = Query(None),
+    version: Optional[int] = Query(None),
 ):
-    user = _get_user_by_slug(db, slug)
+    user = await _get_user_by_slug(db, slug)
     if user.share_mode is ShareMode.PUBLIC_VIEW:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Editing not allowed")
     if user.share_mode is ShareMode.PUBLIC_EDIT and user.edit_token and user.edit_token != edit_token:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid edit token")
     service = TodoService(db)
-    todo = service.toggle_status(user.id, todo_id)
-    message = {
-        "type": "todo_toggled",
-        "payload": todo_schema.TodoResponse.model_validate(todo).model_dump(),
-    }
-    channel = f"calendar:{slug}"
-    await ws_manager.publish(channel, message)
-    user_channel = f"user:{user.id}"
-    await ws_manager.publish(user_channel, message)
+    todo = await service.toggle_status(user.id, todo_id, version)
+    event = todo_event("todo_toggled", todo, ("status",))
+    service.emit([f"calendar:{slug}", f"user:{user.id}"], event)
     return todo
 
 
-@router.get("/{slug}/summary/month", response_model=list[todo_schema.TodoSummary])
+@router.get(
+    "/{slug}/summary/month",
+    response_model=list[todo_schema.TodoSummary],
+    dependencies=[Depends(limit_public_reads)],
+)
 async def public_monthly_summary(
     slug: str,
+    response: Response,
     month: str = Query(..., pattern=r"^\d{4}-\d{2}$"),
-    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db, scope="function"),
 ):
-    user = _get_user_by_slug(db, slug)
-    year, month_value = map(int, month.split("-"))
-    first_day = date(year, month_value, 1)
-    if month_value == 12:
-        next_month = date(year + 1, 1, 1)
-    else:
-        next_month = date(year, month_value + 1, 1)
-    last_day = next_month - timedelta(days=1)
-    service = TodoService(db)
-    summary = service.monthly_summary(user.id, first_day, last_day)
+    user = await _get_user_by_slug(db, slug)
+    etag = make_etag(user.id, await public_cache.change_seq(db, user.id))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, PUBLIC_CACHE_CONTROL)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = PUBLIC_CACHE_CONTROL
+    first_day, last_day = month_bounds(month)
+    summary = await public_cache.monthly_summary(db, user.id, first_day, last_day)
     return [todo_schema.TodoSummary(todo_date=item[0], count=item[1]) for item in summary]
 
 
 @router.websocket("/ws/{slug}")
-async def public_ws(websocket: WebSocket, slug: str, db: Session = Depends(get_db)):
-    _get_user_by_slug(db, slug)
-    channel = f"calendar:{slug}"
-    await ws_manager.connect(websocket, channel)
+async def public_ws(websocket: WebSocket, slug: str):
+    # Scope the lookup session so an open socket does not pin a pooled connection;
+    # cached calendars skip the database entirely.
     try:
-        while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        ws_manager.disconnect(websocket, channel)
+        async with session_scope() as db:
+            user = await _get_user_by_slug(db, slug)
+    except HTTPException as exc:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=str(exc.detail)) from exc
+    await ws_manager.serve(websocket, f"calendar:{slug}", control_handler(user.id))
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..dependencies import get_current_user, get_db
 from ..schemas import sharing as sharing_schema
@@ -11,11 +11,11 @@ router = APIRouter(prefix="/sharing", tags=["sharing"])
 @router.put("", response_model=sharing_schema.SharingResponse)
 async def update_sharing(
     payload: sharing_schema.SharingUpdateRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     current_user=Depends(get_current_user),
 ):
     service = AuthService(db)
-    updated_user = service.update_sharing(
+    updated_user = await service.update_sharing(
         current_user,
         payload.share_mode,
         payload.public_slug,
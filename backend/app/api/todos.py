@@ -1,91 +1,172 @@
-from datetime import date, timedelta
+from datetime import date
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..dependencies import get_current_user, get_db
-from ..events.bus import ws_manager
-from ..models.user import User
+from ..core.conditional import etag_matches, make_etag, not_modified
+from ..dependencies import get_current_principal, get_db
+from ..events.envelope import EventEnvelope
 from ..schemas import todo as todo_schema
-from ..services.todo import TodoService
+from ..services.principal_cache import Principal
+from ..services.todo import TodoService, check_range, month_bounds, todo_event
 
 router = APIRouter(prefix="/todos", tags=["todos"])
+PRIVATE_CACHE_CONTROL = "private, no-cache"
 
 
 @router.get("", response_model=list[todo_schema.TodoResponse])
 async def list_todos(
+    response: Response,
     target_date: date = Query(..., alias="date"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db, scope="function"),
+    current_user: Principal = Depends(get_current_principal),
 ):
     service = TodoService(db)
-    todos = service.list_for_date(current_user.id, target_date)
+    etag = make_etag(current_user.id, await service.current_change_seq(current_user.id))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, PRIVATE_CACHE_CONTROL)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = PRIVATE_CACHE_CONTROL
+    todos = await service.list_for_date(current_user.id, target_date)
     return todos
 
 
+@router.get("/range", response_model=todo_schema.TodoPage)
+async def list_todos_range(
+    first_day: date = Query(..., alias="from"),
+    last_day: date = Query(..., alias="to"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db, scope="function"),
+    current_user: Principal = Depends(get_current_principal),
+):
+    check_range(first_day, last_day)
+    service = TodoService(db)
+    todos, next_cursor = await service.list_range(current_user.id, first_day, last_day, limit, cursor)
+    return todo_schema.TodoPage(items=todos, next_cursor=next_cursor)
+
+
+@router.get("/changes", response_model=todo_schema.TodoChangesResponse)
+async def list_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db, scope="function"),
+    current_user: Principal = Depends(get_current_principal),
+):
+    service = TodoService(db)
+    cursor = await service.current_change_seq(current_user.id)
+    todos, has_more = await service.list_changes(current_user.id, since, cursor, limit)
+    if has_more:
+        cursor = todos[-1].change_seq
+    return todo_schema.TodoChangesResponse(changes=todos, cursor=cursor, has_more=has_more)
+
+
 @router.post("", response_model=todo_schema.TodoResponse, status_code=status.HTTP_201_CREATED)
 async def create_todo(
     payload: todo_schema.TodoCreateRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db, scope="function"),
+    current_user: Principal = Depends(get_current_principal),
 ):
     service = TodoService(db)
-    todo = service.create(current_user.id, payload.model_dump(by_alias=False))
-    message = {"type": "todo_created", "payload": todo_schema.TodoResponse.model_validate(todo).model_dump()}
-    channel = f"user:{current_user.id}"
-    await ws_manager.publish(channel, message)
+    todo = await service.create(current_user.id, payload.model_dump(by_alias=False))
+    event = todo_event("todo_created", todo)
+    service.emit(await service.owner_channels(current_user.id), event)
     return todo
 
 
+@router.post("/batch", response_model=todo_schema.TodoBatchResponse)
+async def batch_todos(
+    payload: todo_schema.TodoBatchRequest,
+    db: AsyncSession = Depends(get_db, scope="function"),
+    current_user: Principal = Depends(get_current_principal),
+):
+    service = TodoService(db)
+    operations = [operation.model_dump(exclude_unset=True, by_alias=False) for operation in payload.operations]
+    results = await service.apply_batch(current_user.id, operations)
+    response = todo_schema.TodoBatchResponse(
+        results=[
+            todo_schema.TodoBatchResult(
+                op=result.op,
+                status=result.status,
+                todo=todo_schema.TodoResponse.model_validate(result.todo) if result.todo else None,
+                detail=result.detail,
+            )
+            for result in results
+        ]
+    )
+    applied = [
+        {"op": result.op, "todo": result.todo.model_dump()}
+        for result in response.results
+        if result.status == "ok"
+    ]
+    if applied:
+        change_seq = max(result.todo.change_seq for result in results if result.status == "ok")
+        event = EventEnvelope("todos_batch", {"operations": applied}, change_seq)
+        service.emit(await service.owner_channels(current_user.id), event)
+    return response
+
+
 @router.patch("/{todo_id}", response_model=todo_schema.TodoResponse)
 async def update_todo(
     todo_id: int,
     payload: todo_schema.TodoUpdateRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db, scope="function"),
+    current_user: Principal = Depends(get_current_principal),
 ):
     service = TodoService(db)
     data = payload.model_dump(exclude_unset=True, by_alias=False)
     version = data.pop("version", None)
     if version is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="version is required")
-    todo = service.update(current_user.id, todo_id, data, version)
-    message = {"type": "todo_updated", "payload": todo_schema.TodoResponse.model_validate(todo).model_dump()}
-    channel = f"user:{current_user.id}"
-    await ws_manager.publish(channel, message)
+    todo = await service.update(current_user.id, todo_id, data, version)
+    event = todo_event("todo_updated", todo, data)
+    service.emit(await service.owner_channels(current_user.id), event)
     return todo
 
 
 @router.post("/{todo_id}/toggle", response_model=todo_schema.TodoResponse)
 async def toggle_todo(
     todo_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    version: Optional[int] = Query(None),
+    db: AsyncSession = Depends(get_db, scope="function"),
+    current_user: Principal = Depends(get_current_principal),
 ):
     service = TodoService(db)
-    todo = service.toggle_status(current_user.id, todo_id)
-    message = {
-        "type": "todo_toggled",
-        "payload": todo_schema.TodoResponse.model_validate(todo).model_dump(),
-    }
-    channel = f"user:{current_user.id}"
-    await ws_manager.publish(channel, message)
+    todo = await service.toggle_status(current_user.id, todo_id, version)
+    event = todo_event("todo_toggled", todo, ("status",))
+    service.emit(await service.owner_channels(current_user.id), event)
     return todo
 
 
 @router.get("/summary/month", response_model=list[todo_schema.TodoSummary])
 async def monthly_summary(
+    response: Response,
     month: str = Query(..., pattern=r"^\d{4}-\d{2}$"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db, scope="function"),
+    current_user: Principal = Depends(get_current_principal),
+):
+    service = TodoService(db)
+    etag = make_etag(current_user.id, await service.current_change_seq(current_user.id))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, PRIVATE_CACHE_CONTROL)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = PRIVATE_CACHE_CONTROL
+    first_day, last_day = month_bounds(month)
+    summary = await service.monthly_summary(current_user.id, first_day, last_day)
+    return [todo_schema.TodoSummary(todo_date=item[0], count=item[1]) for item in summary]
+
+
+@router.get("/summary/range", response_model=list[todo_schema.TodoSummary])
+async def range_summary(
+    first_day: date = Query(..., alias="from"),
+    last_day: date = Query(..., alias="to"),
+    db: AsyncSession = Depends(get_db, scope="function"),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    year, month_value = map(int, month.split("-"))
-    first_day = date(year, month_value, 1)
-    if month_value == 12:
-        next_month = date(year + 1, 1, 1)
-    else:
-        next_month = date(year, month_value + 1, 1)
-    last_day = next_month - timedelta(days=1)
+    check_range(first_day, last_day)
     service = TodoService(db)
-    summary = service.monthly_summary(current_user.id, first_day, last_day)
+    summary = await service.range_summary(current_user.id, first_day, last_day)
     return [todo_schema.TodoSummary(todo_date=item[0], count=item[1]) for item in summary]
@@ -1,19 +1,13 @@
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, WebSocket
 
-from ..dependencies import get_current_user, get_db
+from ..dependencies import get_ws_principal
 from ..events.bus import ws_manager
-from ..models.user import User
+from ..services.principal_cache import Principal
+from ..services.subscriptions import control_handler
 
 router = APIRouter(prefix="/ws", tags=["websocket"])
 
 
 @router.websocket("/user")
-async def user_ws(websocket: WebSocket, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    channel = f"user:{current_user.id}"
-    await ws_manager.connect(websocket, channel)
-    try:
-        while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        ws_manager.disconnect(websocket, channel)
+async def user_ws(websocket: WebSocket, current_user: Principal = Depends(get_ws_principal)):
+    await ws_manager.serve(websocket, f"user:{current_user.id}", control_handler(current_user.id, current_user.id))
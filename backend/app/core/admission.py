@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import random
+import time
+from collections import defaultdict
+from itertools import islice
+from typing import Any, DefaultDict, Optional, Sequence
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import JSONResponse
+
+from .config import Settings, get_settings
+from .metrics import DecayingMax, LoopLagMonitor, loop_lag_monitor, pool_wait
+
+logger = logging.getLogger(__name__)
+
+# (key, refill rate per second, capacity)
+Bucket = tuple[str, float, float]
+
+
+# Token buckets keyed by string. A request takes one token from every bucket it maps
+# to or from none; the return value is 0 when admitted, else seconds until it would be.
+class MemoryBucketStore:
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        # key -> (tokens, updated_at, full_at); a full bucket is the same as a missing one.
+        self.buckets: dict[str, tuple[float, float, float]] = {}
+
+    async def acquire(self, buckets: Sequence[Bucket]) -> float:
+        return self.take(buckets, time.monotonic())
+
+    def take(self, buckets: Sequence[Bucket], now: float) -> float:
+        levels = []
+        retry_after = 0.0
+        for key, rate, capacity in buckets:
+            state = self.buckets.get(key)
+            tokens = capacity if state is None else min(capacity, state[0] + (now - state[1]) * rate)
+            if tokens < 1:
+                retry_after = max(retry_after, (1 - tokens) / rate)
+            levels.append(tokens)
+        if retry_after:
+            return retry_after
+        for (key, rate, capacity), tokens in zip(buckets, levels):
+            self.buckets[key] = (tokens - 1, now, now + (capacity - tokens + 1) / rate)
+        if len(self.buckets) > self.max_keys:
+            self._evict(now)
+        return 0.0
+
+    def _evict(self, now: float) -> None:
+        for key in [key for key, state in self.buckets.items() if state[2] <= now]:
+            del self.buckets[key]
+        if len(self.buckets) > self.max_keys:
+            for key in list(islice(self.buckets, len(self.buckets) - self.max_keys // 2)):
+                del self.buckets[key]
+
+    async def close(self) -> None:
+        return None
+
+
+# Same all-or-nothing semantics in one round trip, using the Redis clock so every
+# instance refills against the same time. All keys of a call must share a hash slot
+# on Redis Cluster.
+TOKEN_BUCKET_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels = {}
+local retry = 0
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[i * 2 - 1])
+  local capacity = tonumber(ARGV[i * 2])
+  local state = redis.call('HMGET', key, 'tokens', 'stamp')
+  local tokens = capacity
+  if state[1] then
+    tokens = math.min(capacity, tonumber(state[1]) + (now - tonumber(state[2])) * rate)
+  end
+  if tokens < 1 then
+    retry = math.max(retry, (1 - tokens) / rate)
+  end
+  levels[i] = tokens
+end
+if retry > 0 then
+  return tostring(retry)
+end
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[i * 2 - 1])
+  local capacity = tonumber(ARGV[i * 2])
+  redis.call('HSET', key, 'tokens', levels[i] - 1, 'stamp', now)
+  redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000))
+end
+return '0'
+"""
+
+
+class RedisBucketStore:
+    def __init__(self, url: str, *, prefix: str = "todo_sync", client: Any = None) -> None:
+        self.url = url
+        self.prefix = prefix
+        self.errors = 0
+        self._client = client
+        self._script: Any = None
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            import redis.asyncio as redis
+
+            self._client = redis.from_url(self.url)
+        return self._client
+
+    async def acquire(self, buckets: Sequence[Bucket]) -> float:
+        if self._script is None:
+            self._script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+        keys = [f"{self.prefix}:ratelimit:{key}" for key, _, _ in buckets]
+        args = [value for _, rate, capacity in buckets for value in (rate, capacity)]
+        try:
+            return float(await self._script(keys=keys, args=args))
+        except Exception:  # noqa: BLE001 - a limiter outage must not take the API down with it
+            self.errors += 1
+            logger.warning("Redis rate limiter unavailable, admitting request", exc_info=True)
+            return 0.0
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+
+
+def create_bucket_store(settings: Settings) -> MemoryBucketStore | RedisBucketStore:
+    if settings.rate_limit_backend == "redis" and settings.redis_url:
+        return RedisBucketStore(str(settings.redis_url), prefix=settings.redis_channel_prefix)
+    return MemoryBucketStore(settings.rate_limit_max_keys)
+
+
+# Budgets are per identity kind: a read is charged to the client IP and the calendar
+# slug, a write additionally to the edit token it presents.
+class RateLimiter:
+    def __init__(self, settings: Settings, store: MemoryBucketStore | RedisBucketStore | None = None) -> None:
+        self.enabled = settings.rate_limit_enabled
+        self.store = store or create_bucket_store(settings)
+        self.trust_forwarded_for = settings.rate_limit_trust_forwarded_for
+        burst = settings.rate_limit_burst_seconds
+        rates = {
+            "read": {
+                "ip": settings.rate_limit_read_ip_per_second,
+                "slug": settings.rate_limit_read_slug_per_second,
+            },
+            "write": {
+                "ip": settings.rate_limit_write_ip_per_second,
+                "slug": settings.rate_limit_write_slug_per_second,
+                "token": settings.rate_limit_write_token_per_second,
+            },
+        }
+        self.budgets = {
+            scope: [(kind, rate, max(1.0, rate * burst)) for kind, rate in kinds.items() if rate > 0]
+            for scope, kinds in rates.items()
+        }
+        self.allowed: DefaultDict[str, int] = defaultdict(int)
+        self.limited: DefaultDict[str, int] = defaultdict(int)
+
+    def client_ip(self, request: Request) -> str:
+        if self.trust_forwarded_for:
+            forwarded = request.headers.get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",", 1)[0].strip()
+        return request.client.host if request.client else "unknown"
+
+    async def check(self, scope: str, request: Request, slug: str, edit_token: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        identities = {"ip": self.client_ip(request), "slug": slug}
+        if edit_token:
+            # Hashed so secrets never end up in Redis key names.
+            identities["token"] = hashlib.sha256(edit_token.encode()).hexdigest()[:32]
+        buckets = [
+            (f"{scope}:{kind}:{identities[kind]}", rate, capacity)
+            for kind, rate, capacity in self.budgets[scope]
+            if kind in identities
+        ]
+        retry_after = await self.store.acquire(buckets)
+        if retry_after > 0:
+            self.limited[scope] += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+        self.allowed[scope] += 1
+
+    def stats(self) -> dict:
+        report = {f"allowed_{scope}": count for scope, count in self.allowed.items()}
+        report.update({f"limited_{scope}": count for scope, count in self.limited.items()})
+        if isinstance(self.store, RedisBucketStore):
+            report["store_errors"] = self.store.errors
+        else:
+            report["tracked_keys"] = len(self.store.buckets)
+        return report
+
+
+# Sheds a share of requests that grows linearly from none at a threshold to all of
+# them at twice the threshold, so admission backs off smoothly instead of flapping.
+class LoadShedder:
+    def __init__(self, settings: Settings, lag: LoopLagMonitor, wait: DecayingMax) -> None:
+        self.enabled = settings.load_shedding_enabled
+        self.retry_after = settings.shed_retry_after_seconds
+        self.exempt = ("/health", "/metrics")
+        self.signals = (
+            ("pool_wait", wait.value, settings.shed_pool_wait_seconds),
+            ("loop_lag", lambda: lag.last_lag, settings.shed_loop_lag_seconds),
+        )
+        self.shed: DefaultDict[str, int] = defaultdict(int)
+
+    def admit(self) -> Optional[str]:
+        for reason, read, threshold in self.signals:
+            if threshold <= 0:
+                continue
+            value = read()
+            if value > threshold and random.random() < (value - threshold) / threshold:
+                self.shed[reason] += 1
+                return reason
+        return None
+
+    def stats(self) -> dict:
+        return {f"shed_{reason}": count for reason, count in self.shed.items()}
+
+
+settings = get_settings()
+rate_limiter = RateLimiter(settings)
+load_shedder = LoadShedder(settings, loop_lag_monitor, pool_wait)
+
+
+async def shed_load(request: Request, call_next):
+    if load_shedder.enabled and not request.url.path.startswith(load_shedder.exempt) and load_shedder.admit():
+        return JSONResponse(
+            {"detail": "Server overloaded"},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(load_shedder.retry_after)},
+        )
+    return await call_next(request)
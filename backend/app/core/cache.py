@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, DefaultDict, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    oversize_rejections: int = 0
+    stale_rejections: int = 0
+
+
+class LRUCache(Generic[V]):
+    """Bounded LRU with per-entry TTL, size cap and tag-based invalidation.
+
+    ``invalidate_tag`` stamps the tag with a new generation even when nothing is cached
+    under it. A fill that reads ``generation`` before its query and hands it to ``set``
+    is dropped if its tag was invalidated meanwhile, so a slow read cannot store the row
+    an invalidation just made stale.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, max_entry_size: Optional[int] = None) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_entry_size = max_entry_size
+        self.stats = CacheStats()
+        self._entries: OrderedDict[Hashable, tuple[float, V, Optional[Hashable]]] = OrderedDict()
+        self._tags: DefaultDict[Hashable, set[Hashable]] = defaultdict(set)
+        self.generation = 0
+        # One int per tag ever invalidated (per user for the caches in this app).
+        self._tag_generations: dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(
+        self,
+        key: Hashable,
+        value: V,
+        *,
+        size: int = 1,
+        tag: Optional[Hashable] = None,
+        generation: Optional[int] = None,
+    ) -> bool:
+        if generation is not None and tag is not None and self._tag_generations.get(tag, 0) > generation:
+            self.stats.stale_rejections += 1
+            return False
+        if self.max_entry_size is not None and size > self.max_entry_size:
+            self.stats.oversize_rejections += 1
+            return False
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value, tag)
+        if tag is not None:
+            self._tags[tag].add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+        return True
+
+    def delete(self, key: Hashable) -> None:
+        if key in self._entries:
+            self._remove(key)
+            self.stats.invalidations += 1
+
+    def invalidate_tag(self, tag: Hashable) -> None:
+        self.generation += 1
+        self._tag_generations[tag] = self.generation
+        for key in list(self._tags.get(tag, ())):
+            self.delete(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"entries": len(self._entries), **vars(self.stats)}
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, tag = self._entries.pop(key)
+        if tag is not None:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
@@ -5,12 +5,66 @@ from typing import Optional
 
 class Settings(BaseSettings):
     database_url: AnyUrl
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle_seconds: int = 1800
+    db_pool_timeout_seconds: float = 30.0
     jwt_secret: str
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 60 * 24
+    auth_cache_max_entries: int = 10_000
+    auth_cache_ttl_seconds: float = 30.0
+    password_hash_rounds: int = 12
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 64
     redis_url: Optional[AnyUrl] = None
+    redis_channel_prefix: str = "todo_sync"
     edit_open_unprotected: bool = False
     timezone: str = "Asia/Seoul"
+    public_cache_max_entries: int = 10_000
+    public_cache_ttl_seconds: float = 30.0
+    public_cache_max_entry_items: int = 500
+    public_http_max_age_seconds: int = 5
+    audit_mode: str = "inline"
+    audit_flush_max_rows: int = 500
+    audit_flush_interval_seconds: float = 1.0
+    audit_queue_max_rows: int = 100_000
+    audit_compact_after_days: int = 30
+    audit_retention_days: int = 365
+    audit_retention_batch_size: int = 1000
+    outbox_batch_size: int = 200
+    outbox_poll_interval_seconds: float = 0.5
+    outbox_recovery_grace_seconds: float = 5.0
+    outbox_retention_hours: int = 24
+    ws_send_queue_size: int = 256
+    ws_send_timeout_seconds: float = 5.0
+    ws_slow_consumer_policy: str = "drop_oldest"
+    ws_heartbeat_interval_seconds: float = 25.0
+    ws_heartbeat_timeout_seconds: float = 60.0
+    ws_max_connections: int = 50_000
+    ws_max_connections_per_channel: int = 1_000
+    ws_max_subscriptions_per_connection: int = 32
+    ws_coalesce_window_seconds: float = 0.0
+    ws_delta_events: bool = True
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"
+    rate_limit_max_keys: int = 100_000
+    rate_limit_burst_seconds: float = 2.0
+    rate_limit_read_ip_per_second: float = 20.0
+    rate_limit_read_slug_per_second: float = 200.0
+    rate_limit_write_ip_per_second: float = 5.0
+    rate_limit_write_slug_per_second: float = 20.0
+    rate_limit_write_token_per_second: float = 10.0
+    rate_limit_trust_forwarded_for: bool = False
+    load_shedding_enabled: bool = True
+    shed_pool_wait_seconds: float = 0.5
+    shed_loop_lag_seconds: float = 0.25
+    shed_retry_after_seconds: int = 2
+    metrics_enabled: bool = True
+    metrics_loop_lag_interval_seconds: float = 0.5
+    profiler_allowed: bool = False
+    # Bearer credential for /metrics and the profiler; both answer 404 until one is set.
+    metrics_token: Optional[str] = None
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, DefaultDict, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from .config import get_settings
+
+LabelValues = tuple[str, ...]
+Sample = tuple[str, dict[str, str], float]
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Sample]:
+        return ()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: dict[LabelValues, list[int]] = {}
+        self._sums: DefaultDict[LabelValues, float] = defaultdict(float)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    def samples(self) -> Iterable[Sample]:
+        for key, counts in self._counts.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(float(bound))}, cumulative
+            yield f"{self.name}_count", labels, cumulative
+            yield f"{self.name}_sum", labels, self._sums[key]
+
+
+# Gauges and counters are computed at scrape time from the component that owns the
+# state, so nothing on the hot path has to keep them up to date.
+class GaugeFamily(Metric):
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str], collect: Callable[[], Iterable[tuple]]
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def samples(self) -> Iterable[Sample]:
+        for *key, value in self.collect():
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+# Same collection as a gauge; the values only ever grow while the process lives.
+class CounterFamily(GaugeFamily):
+    kind = "counter"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Iterable[str], collect: Callable[[], Iterable[tuple]]
+    ) -> GaugeFamily:
+        return self.register(GaugeFamily(name, documentation, labelnames, collect))  # type: ignore[return-value]
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Iterable[str], collect: Callable[[], Iterable[tuple]]
+    ) -> CounterFamily:
+        return self.register(CounterFamily(name, documentation, labelnames, collect))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    "todo_sync_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+REQUEST_DB_TIME = registry.histogram(
+    "todo_sync_http_request_db_seconds", "Time spent in database queries per HTTP request.", ("method", "route")
+)
+REQUEST_DB_QUERIES = registry.histogram(
+    "todo_sync_http_request_db_queries", "Database queries issued per HTTP request.", ("method", "route"), COUNT_BUCKETS
+)
+DB_QUERY_LATENCY = registry.histogram("todo_sync_db_query_duration_seconds", "Latency of individual queries.")
+BROADCAST_LATENCY = registry.histogram(
+    "todo_sync_ws_broadcast_duration_seconds", "Time to fan an event out to local sockets.", ("channel_type",)
+)
+LOOP_LAG = registry.histogram("todo_sync_event_loop_lag_seconds", "Event-loop scheduling delay.")
+POOL_WAIT = registry.histogram("todo_sync_db_pool_wait_seconds", "Time to check a connection out of the pool.")
+
+
+@dataclass
+class RequestDbStats:
+    queries: int = 0
+    seconds: float = 0.0
+
+
+request_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("request_db_stats", default=None)
+
+
+def instrument_engine(sync_engine: Engine) -> None:
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info["query_started"].pop()
+        elapsed = time.perf_counter() - started
+        DB_QUERY_LATENCY.observe(elapsed)
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context) -> None:
+        if context.connection is not None and context.connection.info.get("query_started"):
+            context.connection.info["query_started"].pop()
+
+
+# Jumps to each new peak and halves every half_life seconds, so one saturated
+# checkout is visible at once and fades if nothing else waits.
+class DecayingMax:
+    def __init__(self, half_life: float) -> None:
+        self.half_life = half_life
+        self._value = 0.0
+        self._stamp = time.monotonic()
+
+    def observe(self, sample: float) -> None:
+        now = time.monotonic()
+        self._value = max(self._decayed(now), sample)
+        self._stamp = now
+
+    def value(self) -> float:
+        return self._decayed(time.monotonic())
+
+    def _decayed(self, now: float) -> float:
+        return self._value * 0.5 ** ((now - self._stamp) / self.half_life)
+
+
+pool_wait = DecayingMax(half_life=1.0)
+
+
+# SQLAlchemy has no event before a checkout starts waiting, so the wait is timed
+# around the pool's own getter.
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            POOL_WAIT.observe(waited)
+            pool_wait.observe(waited)
+
+
+def channel_type(channel: str) -> str:
+    return channel.partition(":")[0]
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(0.0, loop.time() - expected)
+            self.max_lag = max(self.max_lag, self.last_lag)
+            LOOP_LAG.observe(self.last_lag)
+
+
+loop_lag_monitor = LoopLagMonitor(get_settings().metrics_loop_lag_interval_seconds)
+
+
+# Samples the event-loop thread's stack from a side thread; stacks are folded
+# into the "a;b;c count" format flamegraph tools read.
+class SamplingProfiler:
+    def __init__(self, max_stacks: int = 5000) -> None:
+        self.max_stacks = max_stacks
+        self.interval = 0.01
+        self.samples: Counter[str] = Counter()
+        self.started_at: Optional[float] = None
+        self._target: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float) -> None:
+        if self.running:
+            return
+        self.interval = interval
+        self.samples.clear()
+        self.started_at = time.time()
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = ";".join(
+                f"{entry.name} ({entry.filename.rsplit('/', 1)[-1]}:{entry.lineno})"
+                for entry in traceback.extract_stack(frame)
+            )
+            if stack in self.samples or len(self.samples) < self.max_stacks:
+                self.samples[stack] += 1
+
+    def folded(self, limit: Optional[int] = None) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common(limit))
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "started_at": self.started_at,
+            "samples": sum(self.samples.values()),
+            "distinct_stacks": len(self.samples),
+        }
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,44 @@
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+from ..core.config import get_settings
+from ..core.db import engine
+from ..models import outbox, todo, todo_audit, todo_daily_count, user  # noqa: F401
+from ..services import retention
+
+
+async def run(args: argparse.Namespace) -> None:
+    now = datetime.utcnow()
+    compact_cutoff = now - timedelta(days=args.compact_after_days)
+    horizon = now - timedelta(days=args.retention_days)
+    steps = ["partition", "compact", "purge"] if args.command == "all" else [args.command]
+    for step in steps:
+        if step == "compact":
+            report = await retention.compact_toggle_runs(compact_cutoff, args.batch_size, args.pause)
+        elif step == "purge":
+            # Whole expired partitions go first; the batched delete then mops up the remainder.
+            if not args.archive:
+                print(await retention.drop_expired_partitions(horizon))
+            report = await retention.purge_expired(horizon, args.batch_size, args.archive, args.pause)
+        else:
+            report = await retention.ensure_monthly_partitions(args.months_ahead)
+        print(report)
+    await engine.dispose()
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Compact, purge and partition the todo_audit table.")
+    parser.add_argument("command", choices=["compact", "purge", "partition", "all"])
+    parser.add_argument("--compact-after-days", type=int, default=settings.audit_compact_after_days)
+    parser.add_argument("--retention-days", type=int, default=settings.audit_retention_days)
+    parser.add_argument("--batch-size", type=int, default=settings.audit_retention_batch_size)
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    parser.add_argument("--archive", action="store_true", help="copy expired rows to todo_audit_archive before deleting")
+    parser.add_argument("--months-ahead", type=int, default=3, help="future monthly partitions to keep ready (MySQL)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
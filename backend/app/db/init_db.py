@@ -1,11 +1,15 @@
+import asyncio
+
 from ..core.db import engine
 from ..models.base import Base
-from ..models import todo, todo_audit, user  # noqa: F401
+from ..models import outbox, todo, todo_audit, todo_daily_count, user  # noqa: F401
 
 
-def create_all() -> None:
-    Base.metadata.create_all(bind=engine)
+async def create_all() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
 
 
 if __name__ == "__main__":
-    create_all()
+    asyncio.run(create_all())
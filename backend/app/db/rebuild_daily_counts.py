@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import sys
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.db import engine, session_scope
+from ..models import outbox, todo, todo_audit, todo_daily_count, user  # noqa: F401
+from ..models.todo import Todo
+from ..models.todo_daily_count import TodoDailyCount
+from ..services.todo import OPEN_STATUSES, daily_count_upsert
+
+CountKey = tuple[int, date]
+
+
+async def expected_counts(session: AsyncSession, user_id: Optional[int] = None) -> dict[CountKey, int]:
+    stmt = (
+        select(Todo.user_id, Todo.todo_local_date, func.count(Todo.id))
+        .where(Todo.status.in_(OPEN_STATUSES), Todo.is_deleted.is_(False))
+        .group_by(Todo.user_id, Todo.todo_local_date)
+    )
+    if user_id is not None:
+        stmt = stmt.where(Todo.user_id == user_id)
+    result = await session.execute(stmt)
+    return {(row[0], row[1]): row[2] for row in result.all()}
+
+
+async def stored_counts(session: AsyncSession, user_id: Optional[int] = None) -> dict[CountKey, int]:
+    stmt = select(TodoDailyCount.user_id, TodoDailyCount.local_date, TodoDailyCount.open_count)
+    if user_id is not None:
+        stmt = stmt.where(TodoDailyCount.user_id == user_id)
+    result = await session.execute(stmt)
+    return {(row[0], row[1]): row[2] for row in result.all()}
+
+
+async def find_drift(session: AsyncSession, user_id: Optional[int] = None) -> dict[CountKey, tuple[int, int]]:
+    expected = await expected_counts(session, user_id)
+    stored = await stored_counts(session, user_id)
+    drift = {}
+    for key in expected.keys() | stored.keys():
+        want, have = expected.get(key, 0), stored.get(key, 0)
+        if want != have:
+            drift[key] = (want, have)
+    return drift
+
+
+async def user_ids(session: AsyncSession) -> list[int]:
+    stmt = select(Todo.user_id).union(select(TodoDailyCount.user_id))
+    return sorted((await session.scalars(stmt)).all())
+
+
+# One short transaction per user. Locking the user's todos first waits out in-flight
+# edits, which update a todo before its count; the fix is then applied as a relative
+# upsert, so increments committed after the read are added to, not overwritten.
+async def repair_user(owner_id: int) -> dict[CountKey, tuple[int, int]]:
+    async with session_scope() as session:
+        await session.execute(select(Todo.id).where(Todo.user_id == owner_id).with_for_update())
+        drift = await find_drift(session, owner_id)
+        dialect_name = session.get_bind().dialect.name
+        for (_, local_date), (want, have) in drift.items():
+            await session.execute(daily_count_upsert(dialect_name, owner_id, local_date, want - have))
+    return drift
+
+
+async def run(rebuild: bool, user_id: Optional[int]) -> int:
+    if rebuild:
+        if user_id is None:
+            async with session_scope() as session:
+                owners = await user_ids(session)
+        else:
+            owners = [user_id]
+        drift = {}
+        for owner_id in owners:
+            drift.update(await repair_user(owner_id))
+    else:
+        async with session_scope() as session:
+            drift = await find_drift(session, user_id)
+    for (owner_id, local_date), (want, have) in sorted(drift.items()):
+        print(f"user={owner_id} date={local_date} expected={want} stored={have}")
+    await engine.dispose()
+    action = "repaired" if rebuild else "found"
+    print(f"{action} {len(drift)} drifted day(s)")
+    return 1 if drift and not rebuild else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Verify or rebuild todo_daily_counts from todos.")
+    parser.add_argument("--rebuild", action="store_true", help="rewrite drifted rows instead of only reporting")
+    parser.add_argument("--user-id", type=int, help="limit to a single user")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.rebuild, args.user_id)))
+
+
+if __name__ == "__main__":
+    main()
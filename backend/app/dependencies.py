@@ -1,24 +1,73 @@
-from collections.abc import Generator
+import time
+from collections.abc import AsyncGenerator
+from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from .core.admission import rate_limiter
 from .core.db import session_scope
 from .models.user import User
 from .services.auth import AuthService
+from .services.principal_cache import Principal, principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_db() -> Generator[Session, None, None]:
-    with session_scope() as session:
+# Used with scope="function" so the commit, and the outbox hand-off and cache
+# invalidation hooked to it, finish before the response is sent; a failed commit
+# then surfaces as an error instead of after the client was told it succeeded.
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with session_scope() as session:
         yield session
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db, scope="function")
+) -> User:
     service = AuthService(db)
-    user = service.decode_token(token)
+    user = await service.decode_token(token)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication")
     return user
+
+
+async def get_current_principal(
+    response: Response, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db, scope="function")
+) -> Principal:
+    started = time.perf_counter()
+    try:
+        principal, cached = await AuthService(db).resolve_principal(token)
+    except HTTPException:
+        principal_cache.record(time.perf_counter() - started, cached=False, rejected=True)
+        raise
+    elapsed = time.perf_counter() - started
+    principal_cache.record(elapsed, cached=cached)
+    response.headers["Server-Timing"] = f'auth;dur={elapsed * 1000:.3f};desc="{"cache" if cached else "db"}"'
+    return principal
+
+
+async def get_ws_principal(websocket: WebSocket, token: Optional[str] = Query(None)) -> Principal:
+    # Browsers cannot set headers on a WebSocket handshake, so ?token= is accepted alongside Bearer.
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        token = credentials if scheme.lower() == "bearer" else None
+    if not token:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Missing token")
+    # The session is closed before the socket is served, so an open socket holds no pooled
+    # connection; a principal-cache hit never checks one out at all.
+    try:
+        async with session_scope() as db:
+            principal, _ = await AuthService(db).resolve_principal(token)
+    except HTTPException as exc:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=str(exc.detail)) from exc
+    return principal
+
+
+async def limit_public_reads(request: Request, slug: str) -> None:
+    await rate_limiter.check("read", request, slug)
+
+
+async def limit_public_writes(request: Request, slug: str, edit_token: Optional[str] = Query(None)) -> None:
+    await rate_limiter.check("write", request, slug, edit_token)
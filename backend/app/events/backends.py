@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Optional, Sequence
+
+from ..core.config import Settings
+from .envelope import EventEnvelope, dumps, loads
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[Sequence[str], EventEnvelope], Awaitable[None]]
+
+
+# Carries events between app instances; the base class only serves this process.
+class BroadcastBackend:
+    async def start(self, deliver: Deliver) -> None:
+        return None
+
+    async def stop(self) -> None:
+        return None
+
+    async def publish(self, channels: Sequence[str], event: EventEnvelope) -> None:
+        return None
+
+
+# One pattern subscription per process multiplexes every channel. Each event is one
+# frame, ``instance_id|["channel", ...]\n<envelope>``, published on its first channel:
+# a process skips its own messages without decoding them, and sockets following
+# several of the channels still get the event once.
+class RedisBroadcastBackend(BroadcastBackend):
+    def __init__(
+        self,
+        url: str,
+        *,
+        prefix: str = "todo_sync",
+        instance_id: Optional[str] = None,
+        client: Any = None,
+        reconnect_max_seconds: float = 30.0,
+    ) -> None:
+        self.url = url
+        self.prefix = prefix
+        self.instance_id = (instance_id or uuid.uuid4().hex).encode()
+        self.reconnect_max_seconds = reconnect_max_seconds
+        self._client = client
+        self._deliver: Optional[Deliver] = None
+        self._task: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            import redis.asyncio as redis
+
+            self._client = redis.from_url(self.url)
+        return self._client
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+
+    async def wait_subscribed(self, timeout: float | None = None) -> None:
+        await asyncio.wait_for(self._subscribed.wait(), timeout)
+
+    async def publish(self, channels: Sequence[str], event: EventEnvelope) -> None:
+        if not channels:
+            return
+        frame = self.instance_id + b"|" + dumps(list(channels)) + b"\n" + event.data
+        try:
+            await self.client.publish(f"{self.prefix}:{channels[0]}", frame)
+        except Exception:  # noqa: BLE001 - remote fan-out must not fail the local write
+            logger.warning("Redis publish failed for %s", ", ".join(channels), exc_info=True)
+
+    async def _listen(self) -> None:
+        backoff = 0.5
+        pattern = f"{self.prefix}:*"
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.psubscribe(pattern)
+                self._subscribed.set()
+                backoff = 0.5
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None and message["type"] == "pmessage":
+                        await self._handle(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001 - reconnect on any transport error
+                self._subscribed.clear()
+                logger.warning("Redis subscriber lost, reconnecting in %.1fs", backoff, exc_info=True)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.reconnect_max_seconds)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:  # noqa: BLE001 - connection may already be gone
+                    pass
+
+    async def _handle(self, redis_channel: bytes | str, data: bytes) -> None:
+        origin, _, rest = data.partition(b"|")
+        if origin == self.instance_id or self._deliver is None:
+            return
+        header, _, body = rest.partition(b"\n")
+        try:
+            channels = loads(header)
+            event = EventEnvelope.from_data(body)
+        except Exception:  # noqa: BLE001 - ignore frames we cannot decode
+            logger.warning("Discarding malformed event on %s", redis_channel)
+            return
+        await self._deliver(channels, event)
+
+
+def create_backend(settings: Settings) -> BroadcastBackend:
+    if settings.redis_url:
+        return RedisBroadcastBackend(str(settings.redis_url), prefix=settings.redis_channel_prefix)
+    return BroadcastBackend()
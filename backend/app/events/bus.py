@@ -1,16 +1,32 @@
 from __future__ import annotations
 
-from collections import defaultdict
-from typing import Callable, DefaultDict, List
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from enum import Enum
+from fnmatch import fnmatchcase
+from typing import Awaitable, Callable, DefaultDict, Deque, Dict, Hashable, Iterable, List, Optional, Sequence, Set
 
-from fastapi import WebSocket
+from fastapi import WebSocket, WebSocketDisconnect
+
+from ..core.config import get_settings
+from ..core.metrics import BROADCAST_LATENCY, channel_type
+from .backends import BroadcastBackend, create_backend
+from .envelope import EventEnvelope, loads, merge_events
+
+logger = logging.getLogger(__name__)
 
 Subscriber = Callable[[dict], None]
+PatternSubscriber = Callable[[str, dict], None]
+MessageHandler = Callable[["ChannelConnection", str], Awaitable[None]]
 
 
 class InMemoryEventBus:
     def __init__(self) -> None:
         self.listeners: DefaultDict[str, List[Subscriber]] = defaultdict(list)
+        self.pattern_listeners: List[tuple[str, PatternSubscriber]] = []
 
     def subscribe(self, channel: str, callback: Subscriber) -> None:
         self.listeners[channel].append(callback)
@@ -19,31 +35,433 @@ class InMemoryEventBus:
         if channel in self.listeners and callback in self.listeners[channel]:
             self.listeners[channel].remove(callback)
 
+    def psubscribe(self, pattern: str, callback: PatternSubscriber) -> None:
+        self.pattern_listeners.append((pattern, callback))
+
+    def punsubscribe(self, pattern: str, callback: PatternSubscriber) -> None:
+        if (pattern, callback) in self.pattern_listeners:
+            self.pattern_listeners.remove((pattern, callback))
+
     def publish(self, channel: str, payload: dict) -> None:
         for callback in list(self.listeners.get(channel, [])):
             callback(payload)
+        for pattern, callback in list(self.pattern_listeners):
+            if fnmatchcase(channel, pattern):
+                callback(channel, payload)
+
+
+class SlowConsumerPolicy(str, Enum):
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+
+@dataclass
+class ChannelStats:
+    sent: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    failed: int = 0
+    disconnected: int = 0
+    evicted: int = 0
+
+    def merge(self, other: ChannelStats) -> None:
+        for name, value in vars(other).items():
+            setattr(self, name, getattr(self, name) + value)
+
+
+@dataclass
+class CoalesceStats:
+    events: int = 0
+    frames: int = 0
+    merged: int = 0
+    frames_saved: int = 0
+
+
+# Leading-edge coalescing per publish target (the channel tuple of a publish). The
+# first event on a quiet target goes out at once and opens a window; events arriving
+# inside it are buffered, later events for a todo merged into earlier ones, and sent
+# as one "batch" frame when the window closes. The window re-arms while events keep
+# coming. Todo payloads carry their version, so clients order by that, not by frame.
+class Coalescer:
+    def __init__(self, manager: WebSocketManager, window: float) -> None:
+        self.manager = manager
+        self.window = window
+        # target -> (events buffered this window keyed by todo id, events received this window)
+        self.pending: Dict[tuple[str, ...], tuple[Dict[Hashable, EventEnvelope], List[int]]] = {}
+        self.stats: DefaultDict[str, CoalesceStats] = defaultdict(CoalesceStats)
+
+    def add(self, channels: Sequence[str], event: EventEnvelope) -> None:
+        target = tuple(channels)
+        stats = self.stats[channel_type(target[0])]
+        stats.events += 1
+        window = self.pending.get(target)
+        if window is None:
+            self._open(target)
+            stats.frames += 1
+            self.manager.fan_out(target, event)
+            return
+        buffer, received = window
+        received[0] += 1
+        key = event.key if event.key is not None else object()
+        previous = buffer.pop(key, None)
+        if previous is not None:
+            stats.merged += 1
+            event = merge_events(previous, event)
+        buffer[key] = event
+
+    def _open(self, target: tuple[str, ...]) -> None:
+        self.pending[target] = ({}, [0])
+        asyncio.get_running_loop().call_later(self.window, self._flush, target)
+
+    def _flush(self, target: tuple[str, ...]) -> None:
+        buffer, received = self.pending.pop(target)
+        if not buffer:
+            return
+        self._open(target)
+        events = list(buffer.values())
+        if len(events) == 1:
+            frame = events[0]
+        else:
+            seqs = [event.seq for event in events if event.seq is not None]
+            frame = EventEnvelope("batch", {"events": [event.message for event in events]}, max(seqs, default=None))
+        stats = self.stats[channel_type(target[0])]
+        stats.frames += 1
+        reached = self.manager.fan_out(target, frame)
+        stats.frames_saved += (received[0] - 1) * reached
+
+
+def _is_pong(text: str) -> bool:
+    if '"pong"' not in text:
+        return False
+    try:
+        message = loads(text)
+    except ValueError:
+        return False
+    return isinstance(message, dict) and message.get("type") == "pong"
+
+
+# broadcast only appends to the queue; the writer task drains it at the client's pace.
+# A socket follows every channel in ``channels`` (its half of the registry's reverse
+# index); ``channel`` is the one it was opened on and owns its per-socket counters.
+class ChannelConnection:
+    def __init__(self, manager: WebSocketManager, websocket: WebSocket, channel: str) -> None:
+        self.manager = manager
+        self.websocket = websocket
+        self.channel = channel
+        self.channels: Set[str] = set()
+        self.queue: Deque[tuple[str, EventEnvelope]] = deque()
+        self.closed = False
+        # Set only by {"type": "pong"} replies. Clients that never pong are not held to the
+        # heartbeat timeout, however many control messages they send; the server's
+        # protocol-level ping/pong covers them.
+        self.last_seen: Optional[float] = None
+        self.paused = False
+        self._ready = asyncio.Event()
+        self._send_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def stats(self) -> ChannelStats:
+        return self.manager.stats_for(self.channel)
 
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._writer())
 
+    def enqueue(self, channel: str, event: EventEnvelope) -> bool:
+        if self.closed:
+            return False
+        if len(self.queue) >= self.manager.queue_size:
+            policy = self.manager.policy
+            if policy is SlowConsumerPolicy.DISCONNECT:
+                self.stats.disconnected += 1
+                self.manager.drop_connection(self)
+                return False
+            if policy is SlowConsumerPolicy.COALESCE and self._coalesce(channel, event):
+                return True
+            dropped, _ = self.queue.popleft()
+            self.manager.stats_for(dropped).dropped += 1
+        self.queue.append((channel, event))
+        self._ready.set()
+        return True
+
+    def _coalesce(self, channel: str, event: EventEnvelope) -> bool:
+        key = event.key
+        if key is None:
+            return False
+        for index, (_, queued) in enumerate(self.queue):
+            if queued.key == key:
+                del self.queue[index]
+                self.queue.append((channel, merge_events(queued, event)))
+                self.manager.stats_for(channel).coalesced += 1
+                return True
+        return False
+
+    async def _writer(self) -> None:
+        timeout = self.manager.send_timeout
+        while not self.closed:
+            if not self.queue or self.paused:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            channel, event = self.queue.popleft()
+            try:
+                async with self._send_lock:
+                    await asyncio.wait_for(self.websocket.send_text(event.text), timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001 - any send failure means the socket is gone
+                logger.debug("Dropping websocket on %s after failed send", self.channel, exc_info=True)
+                self.stats.failed += 1
+                self.manager.drop_connection(self)
+                return
+            self.manager.stats_for(channel).sent += 1
+
+    # pause/send_now/resume let a handler slip a reply (e.g. a snapshot) in front of
+    # queued events; resume(after_seq, channel) drops events on that channel the reply
+    # already reflects. Other channels carry other users' sequences and are left alone.
+    def pause(self) -> None:
+        self.paused = True
+
+    async def send_now(self, event: EventEnvelope) -> None:
+        async with self._send_lock:
+            await asyncio.wait_for(self.websocket.send_text(event.text), self.manager.send_timeout)
+
+    def resume(self, after_seq: Optional[int] = None, channel: Optional[str] = None) -> None:
+        if after_seq is not None:
+            channel = channel or self.channel
+            self.queue = deque(
+                (queued_channel, event)
+                for queued_channel, event in self.queue
+                if queued_channel != channel or event.seq is None or event.seq > after_seq
+            )
+        self.paused = False
+        self._ready.set()
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed = True
+        self.queue.clear()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        try:
+            await self.websocket.close(code)
+        except Exception:  # noqa: BLE001 - socket may already be closed
+            pass
+
+
+# connections maps channel -> set of sockets and each socket keeps the set of channels
+# it follows, so subscribe, unsubscribe and disconnect never scan a channel's members.
 class WebSocketManager:
-    def __init__(self, bus: InMemoryEventBus | None = None) -> None:
+    def __init__(
+        self,
+        bus: InMemoryEventBus | None = None,
+        backend: BroadcastBackend | None = None,
+        *,
+        queue_size: int | None = None,
+        send_timeout: float | None = None,
+        policy: SlowConsumerPolicy | str | None = None,
+        heartbeat_interval: float | None = None,
+        heartbeat_timeout: float | None = None,
+        max_connections: int | None = None,
+        max_channel_connections: int | None = None,
+        max_subscriptions: int | None = None,
+        coalesce_window: float | None = None,
+    ) -> None:
+        settings = get_settings()
         self.bus = bus or InMemoryEventBus()
-        self.connections: DefaultDict[str, List[WebSocket]] = defaultdict(list)
+        self.backend = backend or create_backend(settings)
+        self.queue_size = queue_size or settings.ws_send_queue_size
+        self.send_timeout = send_timeout or settings.ws_send_timeout_seconds
+        self.policy = SlowConsumerPolicy(policy or settings.ws_slow_consumer_policy)
+        self.heartbeat_interval = heartbeat_interval or settings.ws_heartbeat_interval_seconds
+        self.heartbeat_timeout = heartbeat_timeout or settings.ws_heartbeat_timeout_seconds
+        self.max_connections = max_connections or settings.ws_max_connections
+        self.max_channel_connections = max_channel_connections or settings.ws_max_connections_per_channel
+        self.max_subscriptions = max_subscriptions or settings.ws_max_subscriptions_per_connection
+        self.sockets: Set[ChannelConnection] = set()
+        self.connections: Dict[str, Set[ChannelConnection]] = {}
+        self.channel_stats: Dict[str, ChannelStats] = {}
+        # Counters of channels that emptied out, folded per channel type so memory stays flat.
+        self.retired_stats: DefaultDict[str, ChannelStats] = defaultdict(ChannelStats)
+        self.rejected_connections = 0
+        self.rejected_subscriptions = 0
+        window = settings.ws_coalesce_window_seconds if coalesce_window is None else coalesce_window
+        self.coalescer = Coalescer(self, window) if window > 0 else None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    @property
+    def connection_count(self) -> int:
+        return len(self.sockets)
+
+    async def start(self) -> None:
+        await self.backend.start(self.deliver)
+        if self.heartbeat_interval > 0 and self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        await self.backend.stop()
 
-    async def connect(self, websocket: WebSocket, channel: str) -> None:
+    async def connect(self, websocket: WebSocket, channel: str) -> Optional[ChannelConnection]:
         await websocket.accept()
-        self.connections[channel].append(websocket)
+        if (
+            len(self.sockets) >= self.max_connections
+            or len(self.connections.get(channel, ())) >= self.max_channel_connections
+        ):
+            self.rejected_connections += 1
+            await websocket.close(code=1013)
+            return None
+        connection = ChannelConnection(self, websocket, channel)
+        self.sockets.add(connection)
+        self.subscribe(connection, channel)
+        connection.start()
+        return connection
+
+    async def serve(self, websocket: WebSocket, channel: str, on_message: Optional[MessageHandler] = None) -> None:
+        connection = await self.connect(websocket, channel)
+        if connection is None:
+            return
+        try:
+            while True:
+                text = await websocket.receive_text()
+                if _is_pong(text):
+                    connection.last_seen = time.monotonic()
+                elif on_message is not None:
+                    await on_message(connection, text)
+        except WebSocketDisconnect:
+            pass
+        except Exception:  # noqa: BLE001 - a broken receive means the socket is unusable
+            logger.debug("Websocket receive on %s failed", channel, exc_info=True)
+        finally:
+            self.drop_connection(connection)
+
+    def subscribe(self, connection: ChannelConnection, channel: str) -> bool:
+        if channel in connection.channels:
+            return True
+        members = self.connections.get(channel)
+        if (
+            connection.closed
+            or len(connection.channels) >= self.max_subscriptions
+            or (members is not None and len(members) >= self.max_channel_connections)
+        ):
+            self.rejected_subscriptions += 1
+            return False
+        if members is None:
+            members = self.connections[channel] = set()
+            self.channel_stats.setdefault(channel, ChannelStats())
+        members.add(connection)
+        connection.channels.add(channel)
+        return True
+
+    def unsubscribe(self, connection: ChannelConnection, channel: str) -> None:
+        connection.channels.discard(channel)
+        members = self.connections.get(channel)
+        if members is None:
+            return
+        members.discard(connection)
+        if not members:
+            del self.connections[channel]
+            retired = self.channel_stats.pop(channel, None)
+            if retired is not None:
+                self.retired_stats[channel_type(channel)].merge(retired)
+
+    def stats_for(self, channel: str) -> ChannelStats:
+        stats = self.channel_stats.get(channel)
+        return stats if stats is not None else self.retired_stats[channel_type(channel)]
+
+    def drop_connection(self, connection: ChannelConnection, code: int = 1000) -> None:
+        if connection in self.sockets:
+            self.sockets.discard(connection)
+            for channel in list(connection.channels):
+                self.unsubscribe(connection, channel)
+        if not connection.closed:
+            asyncio.create_task(connection.close(code))
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            self.sweep()
+
+    def sweep(self) -> None:
+        now = time.monotonic()
+        ping = EventEnvelope("ping", {})
+        for connection in list(self.sockets):
+            if connection.last_seen is not None and now - connection.last_seen > self.heartbeat_timeout:
+                connection.stats.evicted += 1
+                self.drop_connection(connection, code=1001)
+            else:
+                connection.enqueue(connection.channel, ping)
+
+    # A socket following several of the target channels gets the event once, counted
+    # against the first channel it matched.
+    async def broadcast(self, channels: str | Sequence[str], event: EventEnvelope) -> None:
+        self.fan_out((channels,) if isinstance(channels, str) else channels, event)
+
+    def fan_out(self, channels: Sequence[str], event: EventEnvelope) -> int:
+        started = time.perf_counter()
+        if len(channels) == 1:
+            members = tuple(self.connections.get(channels[0], ()))
+            for connection in members:
+                connection.enqueue(channels[0], event)
+            reached = len(members)
+        else:
+            seen: Set[ChannelConnection] = set()
+            for channel in channels:
+                for connection in tuple(self.connections.get(channel, ())):
+                    if connection not in seen:
+                        seen.add(connection)
+                        connection.enqueue(channel, event)
+            reached = len(seen)
+        BROADCAST_LATENCY.observe(time.perf_counter() - started, channel_type=channel_type(channels[0]))
+        return reached
+
+    async def publish(self, channels: str | Iterable[str], event: EventEnvelope) -> None:
+        if isinstance(channels, str):
+            channels = [channels]
+        else:
+            channels = list(channels)
+        await self.deliver(channels, event)
+        await self.backend.publish(channels, event)
 
-    def disconnect(self, websocket: WebSocket, channel: str) -> None:
-        if websocket in self.connections.get(channel, []):
-            self.connections[channel].remove(websocket)
+    async def deliver(self, channels: Sequence[str], event: EventEnvelope) -> None:
+        if self.coalescer is not None:
+            self.coalescer.add(channels, event)
+        else:
+            self.fan_out(channels, event)
+        for channel in channels:
+            self.bus.publish(channel, event.message)
 
-    async def broadcast(self, channel: str, message: dict) -> None:
-        for connection in list(self.connections.get(channel, [])):
-            await connection.send_json(message)
+    def stats(self) -> Dict[str, dict]:
+        report: Dict[str, dict] = {}
+        for channel, counters in self.channel_stats.items():
+            connections = self.connections.get(channel, ())
+            depths = [len(connection.queue) for connection in connections]
+            report[channel] = {
+                "connections": len(connections),
+                "queue_depth": sum(depths),
+                "max_queue_depth": max(depths, default=0),
+                "sent": counters.sent,
+                "dropped": counters.dropped,
+                "coalesced": counters.coalesced,
+                "failed": counters.failed,
+                "disconnected": counters.disconnected,
+                "evicted": counters.evicted,
+            }
+        return report
 
-    async def publish(self, channel: str, message: dict) -> None:
-        await self.broadcast(channel, message)
-        self.bus.publish(channel, message)
+    def totals(self) -> Dict[str, ChannelStats]:
+        totals: DefaultDict[str, ChannelStats] = defaultdict(ChannelStats)
+        for kind, counters in self.retired_stats.items():
+            totals[kind].merge(counters)
+        for channel, counters in self.channel_stats.items():
+            totals[channel_type(channel)].merge(counters)
+        return totals
 
 
 ws_manager = WebSocketManager()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from functools import cached_property
+from typing import Any, Hashable, Optional
+
+try:  # pragma: no cover - optional speedup
+    import orjson
+except ImportError:  # pragma: no cover - fallback to stdlib encoder
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(message: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(message)
+    return json.dumps(message, default=_default, separators=(",", ":")).encode()
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class EventEnvelope:
+    def __init__(self, type: str, payload: dict, seq: Optional[int] = None) -> None:
+        self.type = type
+        self.payload = payload
+        self.seq = seq
+
+    @classmethod
+    def from_data(cls, data: bytes) -> EventEnvelope:
+        message = loads(data)
+        event = cls(message["type"], message["payload"], message.get("seq"))
+        event.__dict__["data"] = data
+        return event
+
+    @property
+    def message(self) -> dict:
+        message = {"type": self.type, "payload": self.payload}
+        if self.seq is not None:
+            message["seq"] = self.seq
+        return message
+
+    @property
+    def key(self) -> Optional[Hashable]:
+        return self.payload.get("id")
+
+    @cached_property
+    def data(self) -> bytes:
+        return dumps(self.message)
+
+    @cached_property
+    def text(self) -> str:
+        return self.data.decode()
+
+
+TODO_DELTA = "todo_delta"
+# Published on user:<id> when a user's sharing settings or active flag change, so every
+# instance drops its cached calendar and principals for that user.
+ACCOUNT_UPDATED = "account_updated"
+
+
+def event_version(event: EventEnvelope) -> int:
+    version = event.payload.get("version")
+    return version if isinstance(version, int) else -1
+
+
+# Folds two events for the same todo into one that leaves a client in the same state.
+# A delta only applies on top of its base_version, so it is merged into an older full
+# payload or delta that ends at that version; otherwise the newer event wins on its own
+# and a client that misses a version refetches.
+def merge_events(older: EventEnvelope, newer: EventEnvelope) -> EventEnvelope:
+    if event_version(older) > event_version(newer):
+        return older
+    if newer.type != TODO_DELTA or event_version(older) != newer.payload["base_version"]:
+        return newer
+    if older.type == TODO_DELTA:
+        payload = {
+            **newer.payload,
+            "base_version": older.payload["base_version"],
+            "changes": {**older.payload["changes"], **newer.payload["changes"]},
+        }
+        return EventEnvelope(TODO_DELTA, payload, newer.seq)
+    payload = {**older.payload, **newer.payload["changes"], "version": newer.payload["version"]}
+    return EventEnvelope(older.type, payload, newer.seq)
@@ -1,15 +1,48 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-from .api import auth, public, sharing, todos, ws
-from .models import base, todo, todo_audit, user  # noqa: F401
+from .api import auth, metrics, public, sharing, todos, ws
+from .core.admission import rate_limiter, shed_load
+from .core.config import get_settings
+from .core.metrics import loop_lag_monitor, profiler
+from .core.security import password_hasher
+from .events.bus import ws_manager
+from .services.audit import audit_writer
+from .services.outbox import outbox_dispatcher
+from .models import base, outbox, todo, todo_audit, todo_daily_count, user  # noqa: F401
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    await ws_manager.start()
+    await audit_writer.start()
+    await outbox_dispatcher.start()
+    await loop_lag_monitor.start()
+    try:
+        yield
+    finally:
+        await loop_lag_monitor.stop()
+        profiler.stop()
+        await outbox_dispatcher.stop()
+        await audit_writer.stop()
+        await ws_manager.stop()
+        await rate_limiter.store.close()
+        password_hasher.shutdown()
+
 
-app = FastAPI(title="todo_sync API")
+app = FastAPI(title="todo_sync API", lifespan=lifespan)
+# Registered first so it sits inside track_request and shed requests are still counted.
+app.middleware("http")(shed_load)
+if get_settings().metrics_enabled:
+    app.middleware("http")(metrics.track_request)
 
 app.include_router(auth.router)
 app.include_router(todos.router)
 app.include_router(sharing.router)
 app.include_router(public.router)
 app.include_router(ws.router)
+app.include_router(metrics.router)
 
 
 @app.get("/health")
@@ -0,0 +1,3 @@
+# Importing any model module registers every mapper, so relationships declared by
+# name (User.todos -> "Todo") resolve however the package is first reached.
+from . import base, outbox, todo, todo_audit, todo_daily_count, user  # noqa: F401
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import date, datetime
 from typing import Optional, TYPE_CHECKING
 
-from sqlalchemy import Boolean, Date, DateTime, Enum, ForeignKey, Integer, String, Text
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, Enum, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -21,6 +21,10 @@ class TodoStatus(str, Enum):  # type: ignore[misc]
 
 class Todo(Base):
     __tablename__ = "todos"
+    __table_args__ = (
+        Index("ix_todos_user_deleted_date_status", "user_id", "is_deleted", "todo_local_date", "status"),
+        Index("ix_todos_user_change_seq", "user_id", "change_seq"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
@@ -36,6 +40,9 @@ class Todo(Base):
     )
     version: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
     is_deleted: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    change_seq: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
 
     user: Mapped[User] = relationship(back_populates="todos")
-    audits: Mapped[list[TodoAudit]] = relationship(back_populates="todo", cascade="all, delete-orphan")
+    audits: Mapped[list[TodoAudit]] = relationship(
+        back_populates="todo", cascade="all, delete-orphan", primaryjoin="Todo.id == foreign(TodoAudit.todo_id)"
+    )
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import DateTime, Enum, ForeignKey, Integer, JSON, String
+from sqlalchemy import DateTime, Enum, Integer, JSON, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -21,13 +21,32 @@ class TodoAudit(Base):
     __tablename__ = "todo_audit"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    todo_id: Mapped[int] = mapped_column(ForeignKey("todos.id"), nullable=False, index=True)
+    # No foreign key: MySQL cannot range-partition a table that has one, and the
+    # monthly partitions are what let retention drop a month in one statement.
+    todo_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
     action: Mapped[TodoAuditAction] = mapped_column(Enum(TodoAuditAction), nullable=False)
     from_status: Mapped[Optional[TodoStatus]] = mapped_column(Enum(TodoStatus))
     to_status: Mapped[Optional[TodoStatus]] = mapped_column(Enum(TodoStatus))
     editor_user_id: Mapped[Optional[int]] = mapped_column(Integer, index=True)
     editor_ip: Mapped[Optional[str]] = mapped_column(String(64))
     payload: Mapped[Optional[dict]] = mapped_column(JSON)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=datetime.utcnow, index=True
+    )
 
-    todo: Mapped[Todo] = relationship(back_populates="audits")
+    todo: Mapped[Todo] = relationship(back_populates="audits", primaryjoin="foreign(TodoAudit.todo_id) == Todo.id")
+
+
+class TodoAuditArchive(Base):
+    __tablename__ = "todo_audit_archive"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    todo_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    action: Mapped[TodoAuditAction] = mapped_column(Enum(TodoAuditAction), nullable=False)
+    from_status: Mapped[Optional[TodoStatus]] = mapped_column(Enum(TodoStatus))
+    to_status: Mapped[Optional[TodoStatus]] = mapped_column(Enum(TodoStatus))
+    editor_user_id: Mapped[Optional[int]] = mapped_column(Integer)
+    editor_ip: Mapped[Optional[str]] = mapped_column(String(64))
+    payload: Mapped[Optional[dict]] = mapped_column(JSON)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
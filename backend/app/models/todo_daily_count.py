@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import Date, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class TodoDailyCount(Base):
+    __tablename__ = "todo_daily_counts"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    local_date: Mapped[date] = mapped_column(Date(), primary_key=True)
+    open_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -1,7 +1,7 @@
 from datetime import date, datetime
-from typing import Optional
+from typing import Annotated, Literal, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 from ..models.todo import TodoStatus
 
@@ -21,14 +21,22 @@ class TodoCreateRequest(TodoBase):
 
 class TodoUpdateRequest(BaseModel):
     title: Optional[str] = Field(None, max_length=200)
-    description: Optional[str]
+    description: Optional[str] = None
     todo_local_date: Optional[date] = Field(None, alias="todo_date")
-    status: Optional[TodoStatus]
+    status: Optional[TodoStatus] = None
     version: int
 
     class Config:
         populate_by_name = True
 
+    # Omitting a field leaves it unchanged; an explicit null would reach a NOT NULL column.
+    @field_validator("title", "todo_local_date", "status")
+    @classmethod
+    def _not_null(cls, value):
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
 
 class TodoResponse(BaseModel):
     id: int
@@ -45,9 +53,98 @@ class TodoResponse(BaseModel):
         from_attributes = True
 
 
+class TodoChange(TodoResponse):
+    is_deleted: bool
+    change_seq: int
+
+
+class TodoChangesResponse(BaseModel):
+    changes: list[TodoChange]
+    cursor: int
+    has_more: bool
+
+
+class TodoPage(BaseModel):
+    items: list[TodoResponse]
+    next_cursor: Optional[str] = None
+
+
 class TodoSummary(BaseModel):
     todo_local_date: date = Field(alias="todo_date")
     count: int
 
     class Config:
         populate_by_name = True
+
+
+MAX_SUBSCRIBE_CHANNELS = 32
+
+
+class TodoSubscribeRequest(BaseModel):
+    type: Literal["subscribe"]
+    channels: list[str] = Field([], max_length=MAX_SUBSCRIBE_CHANNELS)
+    month: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}$")
+    todo_local_date: Optional[date] = Field(None, alias="date")
+
+
+class TodoUnsubscribeRequest(BaseModel):
+    type: Literal["unsubscribe"]
+    channels: list[str] = Field(..., min_length=1, max_length=MAX_SUBSCRIBE_CHANNELS)
+
+
+TodoControlMessage = Annotated[Union[TodoSubscribeRequest, TodoUnsubscribeRequest], Field(discriminator="type")]
+
+
+class TodoSnapshot(BaseModel):
+    month: Optional[str] = None
+    summary: list[TodoSummary] = []
+    todo_local_date: Optional[date] = Field(None, alias="date")
+    todos: list[TodoResponse] = []
+
+    class Config:
+        populate_by_name = True
+
+
+MAX_BATCH_OPERATIONS = 500
+
+
+class TodoBatchCreate(TodoBase):
+    op: Literal["create"]
+
+
+class TodoBatchUpdate(TodoUpdateRequest):
+    op: Literal["update"]
+    id: int
+
+
+class TodoBatchToggle(BaseModel):
+    op: Literal["toggle"]
+    id: int
+    version: Optional[int] = None
+
+
+class TodoBatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+    version: Optional[int] = None
+
+
+TodoBatchOperation = Annotated[
+    Union[TodoBatchCreate, TodoBatchUpdate, TodoBatchToggle, TodoBatchDelete],
+    Field(discriminator="op"),
+]
+
+
+class TodoBatchRequest(BaseModel):
+    operations: list[TodoBatchOperation] = Field(..., min_length=1, max_length=MAX_BATCH_OPERATIONS)
+
+
+class TodoBatchResult(BaseModel):
+    op: str
+    status: Literal["ok", "not_found", "conflict"]
+    todo: Optional[TodoResponse] = None
+    detail: Optional[str] = None
+
+
+class TodoBatchResponse(BaseModel):
+    results: list[TodoBatchResult]
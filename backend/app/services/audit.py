@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Optional
+
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.config import Settings, get_settings
+from ..core.db import session_scope
+from ..models.todo_audit import TodoAudit
+
+logger = logging.getLogger(__name__)
+
+_STAGED_KEY = "staged_audits"
+
+
+# Buffered mode stages rows on the session and only enqueues them once the
+# transaction commits, so rolled-back mutations never reach todo_audit.
+class AuditWriter:
+    def __init__(self, settings: Settings) -> None:
+        self.enabled = settings.audit_mode == "buffered"
+        self.max_rows = settings.audit_flush_max_rows
+        self.interval = settings.audit_flush_interval_seconds
+        self.max_queue = settings.audit_queue_max_rows
+        self.queue: Deque[tuple[float, dict]] = deque()
+        self.flushed = 0
+        self.dropped = 0
+        self.failures = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def write(self, session: AsyncSession, rows: list[dict]) -> None:
+        if not rows:
+            return
+        if self.enabled:
+            session.info.setdefault(_STAGED_KEY, []).extend(rows)
+        else:
+            await session.execute(insert(TodoAudit), rows)
+
+    def enqueue(self, rows: list[dict]) -> None:
+        now = time.monotonic()
+        for row in rows:
+            if len(self.queue) >= self.max_queue:
+                self.queue.popleft()
+                self.dropped += 1
+                logger.error("Audit queue full, dropped oldest record")
+            self.queue.append((now, row))
+        if self._wakeup is not None and len(self.queue) >= self.max_rows:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(self._wakeup))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        written = 0
+        while self.queue:
+            batch = [self.queue.popleft() for _ in range(min(self.max_rows, len(self.queue)))]
+            try:
+                async with session_scope() as session:
+                    await session.execute(insert(TodoAudit), [row for _, row in batch])
+            except Exception:  # noqa: BLE001 - keep the rows and retry on the next tick
+                self.queue.extendleft(reversed(batch))
+                self.failures += 1
+                logger.exception("Failed to flush %d audit records", len(batch))
+                break
+            written += len(batch)
+        self.flushed += written
+        return written
+
+    async def _run(self, wakeup: asyncio.Event) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+            await self.flush()
+
+    def lag_seconds(self) -> float:
+        if not self.queue:
+            return 0.0
+        return time.monotonic() - self.queue[0][0]
+
+    def stats(self) -> dict:
+        return {
+            "mode": "buffered" if self.enabled else "inline",
+            "queue_depth": len(self.queue),
+            "lag_seconds": round(self.lag_seconds(), 3),
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failures": self.failures,
+        }
+
+
+audit_writer = AuditWriter(get_settings())
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_committed_audits(session: Session) -> None:
+    rows = session.info.pop(_STAGED_KEY, None)
+    if rows:
+        audit_writer.enqueue(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_audits(session: Session) -> None:
+    session.info.pop(_STAGED_KEY, None)
@@ -4,31 +4,56 @@ from typing import Optional
 from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import get_settings
-from ..core.security import create_access_token, hash_password, verify_password
+from ..core.security import PasswordHasherBusy, create_access_token, password_hasher
+from ..events.envelope import ACCOUNT_UPDATED, EventEnvelope
 from ..models.user import ShareMode, User
+from .principal_cache import Principal, principal_cache
+from .outbox import stage_event
 
 settings = get_settings()
 
 
+def _hasher_overloaded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent sign-ins, retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 class AuthService:
-    def __init__(self, session: Session):
+    def __init__(self, session: AsyncSession):
         self.session = session
 
-    def register(self, email: str, password: str, name: Optional[str] = None) -> User:
-        if self.session.execute(select(User).where(User.email == email)).scalar_one_or_none():
+    async def register(self, email: str, password: str, name: Optional[str] = None) -> User:
+        existing = await self.session.execute(select(User).where(User.email == email))
+        if existing.scalar_one_or_none():
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
-        user = User(email=email, password_hash=hash_password(password), name=name)
+        try:
+            password_hash = await password_hasher.hash(password)
+        except PasswordHasherBusy as exc:
+            raise _hasher_overloaded() from exc
+        user = User(email=email, password_hash=password_hash, name=name)
         self.session.add(user)
-        self.session.flush()
+        await self.session.flush()
         return user
 
-    def authenticate(self, email: str, password: str) -> User:
-        user = self.session.execute(select(User).where(User.email == email)).scalar_one_or_none()
-        if not user or not verify_password(password, user.password_hash):
+    async def authenticate(self, email: str, password: str) -> User:
+        result = await self.session.execute(select(User).where(User.email == email))
+        user = result.scalar_one_or_none()
+        if not user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+        try:
+            valid, new_hash = await password_hasher.verify_and_update(password, user.password_hash)
+        except PasswordHasherBusy as exc:
+            raise _hasher_overloaded() from exc
+        if not valid:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+        if new_hash:
+            user.password_hash = new_hash
         user.last_login_at = datetime.now(timezone.utc)
         self.session.add(user)
         return user
@@ -36,30 +61,57 @@ class AuthService:
     def issue_token(self, user: User) -> str:
         return create_access_token(str(user.id))
 
-    def decode_token(self, token: str) -> User:
+    def _decode_claims(self, token: str) -> dict:
         try:
             payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-            user_id = payload.get("sub")
-            if user_id is None:
+            if payload.get("sub") is None:
                 raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
         except JWTError as exc:  # pragma: no cover - external lib validation
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from exc
+        return payload
+
+    async def decode_token(self, token: str) -> User:
+        payload = self._decode_claims(token)
+        user = await self.session.get(User, int(payload["sub"]))
+        if not user or not user.is_active:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive user")
+        return user
 
-        user = self.session.get(User, int(user_id))
+    async def resolve_principal(self, token: str) -> tuple[Principal, bool]:
+        principal = principal_cache.get(token)
+        if principal is not None:
+            return principal, True
+        generation = principal_cache.generation
+        payload = self._decode_claims(token)
+        user = await self.session.get(User, int(payload["sub"]))
         if not user or not user.is_active:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive user")
+        principal = Principal(user.id, user.email, float(payload.get("exp", 0)))
+        principal_cache.set(token, principal, generation)
+        return principal, False
+
+    # Caches are evicted by the account_updated event once the change commits, on every
+    # instance; evicting here would let a concurrent read refill them with the old row.
+    def _account_updated(self, user: User) -> None:
+        stage_event(self.session, f"user:{user.id}", EventEnvelope(ACCOUNT_UPDATED, {"user_id": user.id}))
+
+    async def set_active(self, user: User, is_active: bool) -> User:
+        user.is_active = is_active
+        self.session.add(user)
+        self._account_updated(user)
         return user
 
-    def update_sharing(self, user: User, share_mode: ShareMode, public_slug: Optional[str], edit_token: Optional[str]) -> User:
+    async def update_sharing(self, user: User, share_mode: ShareMode, public_slug: Optional[str], edit_token: Optional[str]) -> User:
         if share_mode is ShareMode.PRIVATE:
             user.public_slug = None
             user.edit_token = None
         else:
             if not public_slug:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="public_slug is required")
-            existing_slug = self.session.execute(
+            result = await self.session.execute(
                 select(User).where(User.public_slug == public_slug, User.id != user.id)
-            ).scalar_one_or_none()
+            )
+            existing_slug = result.scalar_one_or_none()
             if existing_slug:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Slug already in use")
             user.public_slug = public_slug
@@ -71,4 +123,5 @@ class AuthService:
                 user.edit_token = None
         user.share_mode = share_mode
         self.session.add(user)
+        self._account_updated(user)
         return user
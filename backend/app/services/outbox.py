@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Deque, Iterable, Optional
+
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.config import Settings, get_settings
+from ..core.db import session_scope
+from ..events.bus import WebSocketManager, ws_manager
+from ..events.envelope import EventEnvelope
+from ..models.outbox import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+_STAGED_KEY = "staged_outbox"
+CommitHook = Callable[[str, dict], None]
+_commit_hooks: list[CommitHook] = []
+
+
+def on_commit(hook: CommitHook) -> None:
+    # For process-local state (caches) that must reflect a write before the response returns.
+    # Hooks get the same (channel, message) as bus subscribers, which cover other instances.
+    _commit_hooks.append(hook)
+
+
+def stage_event(session: AsyncSession, channels: str | Iterable[str], envelope: EventEnvelope) -> None:
+    channels = [channels] if isinstance(channels, str) else list(channels)
+    row = OutboxEvent(channels=channels, type=envelope.type, seq=envelope.seq, message=envelope.text)
+    session.add(row)
+    session.info.setdefault(_STAGED_KEY, []).append((row, envelope))
+
+
+# Committed events are handed over in commit order and published straight from
+# memory; the rows are marked in batches afterwards. Rows left unmarked past the
+# grace period (crash, failed mark, another instance died) are claimed oldest-first
+# with FOR UPDATE and re-sent, so delivery is at-least-once.
+class OutboxDispatcher:
+    def __init__(self, settings: Settings, manager: WebSocketManager) -> None:
+        self.manager = manager
+        self.batch_size = settings.outbox_batch_size
+        self.interval = settings.outbox_poll_interval_seconds
+        self.grace = timedelta(seconds=settings.outbox_recovery_grace_seconds)
+        self.retention = timedelta(hours=settings.outbox_retention_hours)
+        self.pending: Deque[tuple[int, list[str], EventEnvelope]] = deque()
+        self.unmarked: list[int] = []
+        self.dispatched = 0
+        self.recovered = 0
+        self.failures = 0
+        self.pruned = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._maintenance_task: Optional[asyncio.Task] = None
+
+    def committed(self, staged: list[tuple[OutboxEvent, EventEnvelope]]) -> None:
+        for row, envelope in staged:
+            for channel in row.channels:
+                for hook in _commit_hooks:
+                    hook(channel, envelope.message)
+            self.pending.append((row.id, row.channels, envelope))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._publish_loop(self._wakeup))
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+
+    async def stop(self) -> None:
+        for task in (self._task, self._maintenance_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._maintenance_task = None
+        self._wakeup = None
+        await self.flush()
+        await self.mark_published()
+
+    async def flush(self) -> int:
+        count = 0
+        while self.pending:
+            row_id, channels, envelope = self.pending.popleft()
+            await self.manager.publish(channels, envelope)
+            self.unmarked.append(row_id)
+            count += 1
+        self.dispatched += count
+        return count
+
+    async def mark_published(self) -> int:
+        if not self.unmarked:
+            return 0
+        ids, self.unmarked = self.unmarked, []
+        try:
+            await self._mark(ids)
+        except Exception:  # noqa: BLE001 - unmarked rows are re-sent by recover()
+            self.failures += 1
+            logger.exception("Failed to mark %d outbox events as dispatched", len(ids))
+            return 0
+        return len(ids)
+
+    async def recover(self) -> int:
+        recovered = 0
+        while True:
+            cutoff = datetime.utcnow() - self.grace
+            async with session_scope() as session:
+                result = await session.execute(
+                    select(OutboxEvent.id, OutboxEvent.channels, OutboxEvent.message)
+                    .where(OutboxEvent.dispatched_at.is_(None), OutboxEvent.created_at < cutoff)
+                    .order_by(OutboxEvent.id)
+                    .limit(self.batch_size)
+                    .with_for_update()
+                )
+                rows = result.all()
+                for _, channels, message in rows:
+                    await self.manager.publish(channels, EventEnvelope.from_data(message.encode()))
+                if rows:
+                    await self._mark([row[0] for row in rows], session)
+            recovered += len(rows)
+            if len(rows) < self.batch_size:
+                break
+        self.recovered += recovered
+        return recovered
+
+    # Batches until one comes back short, so pruning keeps up with any event rate.
+    async def prune(self) -> int:
+        pruned = 0
+        cutoff = datetime.utcnow() - self.retention
+        while True:
+            async with session_scope() as session:
+                result = await session.execute(
+                    select(OutboxEvent.id)
+                    .where(OutboxEvent.dispatched_at.is_not(None), OutboxEvent.dispatched_at < cutoff)
+                    .order_by(OutboxEvent.id)
+                    .limit(self.batch_size)
+                )
+                ids = result.scalars().all()
+                if ids:
+                    await session.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids)))
+            pruned += len(ids)
+            self.pruned += len(ids)
+            if len(ids) < self.batch_size:
+                break
+        return pruned
+
+    async def _mark(self, ids: list[int], session: Optional[AsyncSession] = None) -> None:
+        if session is None:
+            async with session_scope() as scoped:
+                await self._mark(ids, scoped)
+            return
+        now = datetime.utcnow()
+        for start in range(0, len(ids), self.batch_size):
+            chunk = ids[start : start + self.batch_size]
+            await session.execute(update(OutboxEvent).where(OutboxEvent.id.in_(chunk)).values(dispatched_at=now))
+
+    async def _publish_loop(self, wakeup: asyncio.Event) -> None:
+        while True:
+            await wakeup.wait()
+            wakeup.clear()
+            await self.flush()
+
+    # Marking, recovery and pruning all write to the database; keeping them off the
+    # publish loop means a busy database never delays delivery.
+    async def _maintenance_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.mark_published()
+                await self.recover()
+                await self.prune()
+            except Exception:  # noqa: BLE001 - retried on the next poll
+                self.failures += 1
+                logger.exception("Outbox maintenance failed")
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.pending),
+            "unmarked": len(self.unmarked),
+            "dispatched": self.dispatched,
+            "recovered": self.recovered,
+            "failures": self.failures,
+            "pruned": self.pruned,
+        }
+
+
+outbox_dispatcher = OutboxDispatcher(get_settings(), ws_manager)
+
+
+@event.listens_for(Session, "after_commit")
+def _hand_over_committed_events(session: Session) -> None:
+    staged = session.info.pop(_STAGED_KEY, None)
+    if staged:
+        outbox_dispatcher.committed(staged)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_events(session: Session) -> None:
+    session.info.pop(_STAGED_KEY, None)
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from ..core.cache import LRUCache
+from ..core.config import Settings, get_settings
+from ..events.bus import ws_manager
+from ..events.envelope import ACCOUNT_UPDATED
+from .outbox import on_commit
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    email: str
+    expires_at: float
+
+
+@dataclass
+class AuthStats:
+    requests: int = 0
+    cache_hits: int = 0
+    lookups: int = 0
+    rejected: int = 0
+    seconds_total: float = 0.0
+
+
+# Keyed by a digest of the raw token so a leaked cache dump is not a set of
+# bearer credentials; entries never outlive the token's own exp claim.
+class PrincipalCache:
+    def __init__(self, settings: Settings) -> None:
+        self.enabled = settings.auth_cache_ttl_seconds > 0
+        self.principals: LRUCache[Principal] = LRUCache(
+            settings.auth_cache_max_entries, settings.auth_cache_ttl_seconds
+        )
+        self.stats = AuthStats()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Principal]:
+        if not self.enabled:
+            return None
+        key = self.key(token)
+        principal = self.principals.get(key)
+        if principal is not None and principal.expires_at <= time.time():
+            self.principals.delete(key)
+            return None
+        return principal
+
+    @property
+    def generation(self) -> int:
+        return self.principals.generation
+
+    def set(self, token: str, principal: Principal, generation: Optional[int] = None) -> None:
+        if self.enabled:
+            self.principals.set(self.key(token), principal, tag=principal.id, generation=generation)
+
+    def invalidate_user(self, user_id: int) -> None:
+        self.principals.invalidate_tag(user_id)
+
+    def on_event(self, channel: str, message: dict) -> None:
+        if message.get("type") == ACCOUNT_UPDATED:
+            self.invalidate_user(message["payload"]["user_id"])
+
+    def record(self, seconds: float, *, cached: bool, rejected: bool = False) -> None:
+        self.stats.requests += 1
+        self.stats.seconds_total += seconds
+        if rejected:
+            self.stats.rejected += 1
+        elif cached:
+            self.stats.cache_hits += 1
+        else:
+            self.stats.lookups += 1
+
+    def snapshot(self) -> dict:
+        return {"cache": self.principals.snapshot(), **vars(self.stats)}
+
+
+principal_cache = PrincipalCache(get_settings())
+on_commit(principal_cache.on_event)
+ws_manager.bus.psubscribe("user:*", principal_cache.on_event)
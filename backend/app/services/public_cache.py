@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.cache import LRUCache
+from ..core.config import Settings, get_settings
+from ..events.bus import ws_manager
+from ..events.envelope import ACCOUNT_UPDATED
+from ..models.user import ShareMode, User
+from ..schemas import todo as todo_schema
+from .outbox import on_commit
+from .todo import TodoService
+
+
+@dataclass(frozen=True)
+class PublicCalendar:
+    id: int
+    public_slug: str
+    share_mode: ShareMode
+    edit_token: Optional[str]
+
+
+class PublicCalendarCache:
+    def __init__(self, settings: Settings) -> None:
+        max_entries, ttl = settings.public_cache_max_entries, settings.public_cache_ttl_seconds
+        self.calendars: LRUCache[PublicCalendar] = LRUCache(max_entries, ttl)
+        self.todo_lists: LRUCache[list[todo_schema.TodoResponse]] = LRUCache(
+            max_entries, ttl, max_entry_size=settings.public_cache_max_entry_items
+        )
+        self.summaries: LRUCache[list[tuple[date, int]]] = LRUCache(max_entries, ttl)
+        self.change_seqs: LRUCache[int] = LRUCache(max_entries, ttl)
+
+    async def get_calendar(self, session: AsyncSession, slug: str) -> PublicCalendar:
+        calendar = self.calendars.get(slug)
+        if calendar is None:
+            generation = self.calendars.generation
+            result = await session.execute(select(User).where(User.public_slug == slug))
+            user = result.scalar_one_or_none()
+            if not user or user.share_mode is ShareMode.PRIVATE:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Calendar not public")
+            calendar = PublicCalendar(user.id, slug, user.share_mode, user.edit_token)
+            self.calendars.set(slug, calendar, tag=user.id, generation=generation)
+        return calendar
+
+    async def list_for_date(
+        self, session: AsyncSession, user_id: int, target_date: date
+    ) -> list[todo_schema.TodoResponse]:
+        key = (user_id, target_date)
+        todos = self.todo_lists.get(key)
+        if todos is None:
+            generation = self.todo_lists.generation
+            rows = await TodoService(session).list_for_date(user_id, target_date)
+            todos = [todo_schema.TodoResponse.model_validate(row) for row in rows]
+            self.todo_lists.set(key, todos, size=len(todos), tag=user_id, generation=generation)
+        return todos
+
+    async def monthly_summary(
+        self, session: AsyncSession, user_id: int, first_day: date, last_day: date
+    ) -> list[tuple[date, int]]:
+        key = (user_id, first_day, last_day)
+        summary = self.summaries.get(key)
+        if summary is None:
+            generation = self.summaries.generation
+            summary = list(await TodoService(session).monthly_summary(user_id, first_day, last_day))
+            self.summaries.set(key, summary, tag=user_id, generation=generation)
+        return summary
+
+    async def change_seq(self, session: AsyncSession, user_id: int) -> int:
+        change_seq = self.change_seqs.get(user_id)
+        if change_seq is None:
+            generation = self.change_seqs.generation
+            change_seq = await TodoService(session).current_change_seq(user_id)
+            self.change_seqs.set(user_id, change_seq, tag=user_id, generation=generation)
+        return change_seq
+
+    def invalidate_user(self, user_id: int) -> None:
+        self.todo_lists.invalidate_tag(user_id)
+        self.summaries.invalidate_tag(user_id)
+        self.change_seqs.invalidate_tag(user_id)
+
+    def on_event(self, channel: str, message: dict) -> None:
+        _, _, user_id = channel.partition(":")
+        if user_id.isdigit():
+            self.invalidate_user(int(user_id))
+            if message.get("type") == ACCOUNT_UPDATED:
+                # Calendars are tagged by owner, which covers the slug it had and the one it took.
+                self.calendars.invalidate_tag(int(user_id))
+
+    def stats(self) -> dict[str, dict]:
+        return {
+            "calendars": self.calendars.snapshot(),
+            "todo_lists": self.todo_lists.snapshot(),
+            "summaries": self.summaries.snapshot(),
+            "change_seqs": self.change_seqs.snapshot(),
+        }
+
+
+public_cache = PublicCalendarCache(get_settings())
+# The commit hook keeps this process read-your-writes; the bus covers writes made elsewhere.
+on_commit(public_cache.on_event)
+ws_manager.bus.psubscribe("user:*", public_cache.on_event)
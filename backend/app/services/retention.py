@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import delete, func, literal, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.db import engine, session_scope
+from ..models.todo_audit import TodoAudit, TodoAuditAction, TodoAuditArchive
+
+_ARCHIVE_COLUMNS = (
+    "id",
+    "todo_id",
+    "action",
+    "from_status",
+    "to_status",
+    "editor_user_id",
+    "editor_ip",
+    "payload",
+    "created_at",
+)
+
+
+@dataclass
+class RetentionReport:
+    step: str
+    rows: int = 0
+    batches: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+    note: Optional[str] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def done(self, note: Optional[str] = None) -> RetentionReport:
+        self.finished = time.perf_counter()
+        self.note = note
+        return self
+
+    def __str__(self) -> str:
+        line = (
+            f"{self.step}: {self.rows} rows in {self.elapsed:.2f}s "
+            f"({self.rows_per_second:.0f} rows/s, {self.batches} batches)"
+        )
+        return f"{line} - {self.note}" if self.note else line
+
+
+def _compacted_count(audit: TodoAudit) -> int:
+    if isinstance(audit.payload, dict):
+        return int(audit.payload.get("compacted", 1))
+    return 1
+
+
+def _first_at(audit: TodoAudit) -> datetime:
+    if isinstance(audit.payload, dict) and "first_at" in audit.payload:
+        return datetime.fromisoformat(audit.payload["first_at"])
+    return audit.created_at
+
+
+async def _toggle_runs(todo_id: int, cutoff: datetime) -> list[list[TodoAudit]]:
+    async with session_scope() as session:
+        result = await session.execute(
+            select(TodoAudit)
+            .where(TodoAudit.todo_id == todo_id, TodoAudit.created_at < cutoff)
+            .order_by(TodoAudit.created_at, TodoAudit.id)
+        )
+        runs: list[list[TodoAudit]] = [[]]
+        for audit in result.scalars():
+            if audit.action == TodoAuditAction.TOGGLE:
+                runs[-1].append(audit)
+            elif runs[-1]:
+                runs.append([])
+    return [run for run in runs if len(run) > 1]
+
+
+# The last row of a run survives. Each batch of older rows is folded into it and deleted
+# in its own transaction, so the survivor always accounts for exactly the rows already
+# gone; a run interrupted midway is finished correctly by the next pass. The run starts
+# at its earliest first_at, which after an interruption is on the survivor itself.
+async def _compact_run(run: list[TodoAudit], batch_size: int) -> int:
+    survivor, stale = run[-1], run[:-1]
+    origin = min(run, key=_first_at)
+    compacted = _compacted_count(survivor)
+    for start in range(0, len(stale), batch_size):
+        batch = stale[start : start + batch_size]
+        compacted += sum(_compacted_count(audit) for audit in batch)
+        async with session_scope() as session:
+            await session.execute(
+                update(TodoAudit)
+                .where(TodoAudit.id == survivor.id)
+                .values(
+                    from_status=origin.from_status,
+                    payload={
+                        "compacted": compacted,
+                        "first_at": _first_at(origin).isoformat(),
+                        "last_at": survivor.created_at.isoformat(),
+                    },
+                )
+            )
+            await session.execute(delete(TodoAudit).where(TodoAudit.id.in_([audit.id for audit in batch])))
+    return len(stale)
+
+
+async def compact_toggle_runs(cutoff: datetime, batch_size: int, pause: float = 0.0) -> RetentionReport:
+    # One short transaction per batch of deletes keeps row locks brief; keyset on todo_id
+    # makes it a single pass.
+    report = RetentionReport("compact")
+    last_todo_id = 0
+    while True:
+        async with session_scope() as session:
+            result = await session.execute(
+                select(TodoAudit.todo_id)
+                .where(
+                    TodoAudit.todo_id > last_todo_id,
+                    TodoAudit.action == TodoAuditAction.TOGGLE,
+                    TodoAudit.created_at < cutoff,
+                )
+                .group_by(TodoAudit.todo_id)
+                .having(func.count(TodoAudit.id) > 1)
+                .order_by(TodoAudit.todo_id)
+                .limit(batch_size)
+            )
+            todo_ids = result.scalars().all()
+        if not todo_ids:
+            break
+        for todo_id in todo_ids:
+            for run in await _toggle_runs(todo_id, cutoff):
+                report.rows += await _compact_run(run, batch_size)
+        last_todo_id = todo_ids[-1]
+        report.batches += 1
+        if pause:
+            await asyncio.sleep(pause)
+    return report.done()
+
+
+async def purge_expired(horizon: datetime, batch_size: int, archive: bool = False, pause: float = 0.0) -> RetentionReport:
+    report = RetentionReport("archive" if archive else "purge")
+    while True:
+        async with session_scope() as session:
+            result = await session.execute(
+                select(TodoAudit.id).where(TodoAudit.created_at < horizon).order_by(TodoAudit.id).limit(batch_size)
+            )
+            ids = result.scalars().all()
+            if not ids:
+                break
+            if archive:
+                columns = [getattr(TodoAudit, name) for name in _ARCHIVE_COLUMNS]
+                await session.execute(
+                    TodoAuditArchive.__table__.insert().from_select(
+                        [*_ARCHIVE_COLUMNS, "archived_at"],
+                        select(*columns, literal(datetime.utcnow())).where(TodoAudit.id.in_(ids)),
+                    )
+                )
+            await session.execute(delete(TodoAudit).where(TodoAudit.id.in_(ids)))
+        report.rows += len(ids)
+        report.batches += 1
+        if pause:
+            await asyncio.sleep(pause)
+    return report.done()
+
+
+def _month_start(value: date, offset: int = 0) -> date:
+    month_index = value.year * 12 + value.month - 1 + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _partition_clause(month: date) -> str:
+    upper = _month_start(month, 1)
+    return f"PARTITION p{month:%Y%m} VALUES LESS THAN (TO_DAYS('{upper.isoformat()}'))"
+
+
+async def _mysql_partitions(session: AsyncSession) -> list[str]:
+    result = await session.execute(
+        text(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'todo_audit' AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        )
+    )
+    return list(result.scalars())
+
+
+async def ensure_monthly_partitions(months_ahead: int, today: Optional[date] = None) -> RetentionReport:
+    report = RetentionReport("partition")
+    if engine.dialect.name != "mysql":
+        return report.done(f"skipped: range partitioning is only managed on MySQL, not {engine.dialect.name}")
+    today = today or datetime.utcnow().date()
+    wanted = [_month_start(today, offset) for offset in range(-1, months_ahead + 1)]
+    async with session_scope() as session:
+        # Schemas created before todo_audit dropped its todo_id foreign key still carry it,
+        # and MySQL refuses to partition a table that has one.
+        result = await session.execute(
+            text(
+                "SELECT DISTINCT CONSTRAINT_NAME FROM information_schema.KEY_COLUMN_USAGE "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'todo_audit' AND REFERENCED_TABLE_NAME IS NOT NULL"
+            )
+        )
+        for name in result.scalars():
+            await session.execute(text(f"ALTER TABLE todo_audit DROP FOREIGN KEY `{name}`"))
+        existing = set(await _mysql_partitions(session))
+        if not existing:
+            clauses = ", ".join(_partition_clause(month) for month in wanted)
+            await session.execute(
+                text(
+                    "ALTER TABLE todo_audit DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at) "
+                    f"PARTITION BY RANGE (TO_DAYS(created_at)) ({clauses}, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+                )
+            )
+            report.rows = len(wanted)
+        else:
+            missing = [month for month in wanted if f"p{month:%Y%m}" not in existing and month > today.replace(day=1)]
+            if missing:
+                clauses = ", ".join(_partition_clause(month) for month in missing)
+                await session.execute(
+                    text(
+                        f"ALTER TABLE todo_audit REORGANIZE PARTITION pmax INTO "
+                        f"({clauses}, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+                    )
+                )
+            report.rows = len(missing)
+    report.batches = 1
+    return report.done("partitions added")
+
+
+async def drop_expired_partitions(horizon: datetime) -> RetentionReport:
+    report = RetentionReport("drop_partitions")
+    if engine.dialect.name != "mysql":
+        return report.done("skipped: not MySQL")
+    async with session_scope() as session:
+        expired = []
+        for name in await _mysql_partitions(session):
+            if name == "pmax":
+                continue
+            month = date(int(name[1:5]), int(name[5:7]), 1)
+            if _month_start(month, 1) <= horizon.date():
+                expired.append(name)
+        if expired:
+            await session.execute(text(f"ALTER TABLE todo_audit DROP PARTITION {', '.join(expired)}"))
+    report.rows = len(expired)
+    report.batches = 1 if expired else 0
+    return report.done(f"dropped {len(expired)} partition(s)")
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from ..core.db import session_scope
+from ..events.bus import ChannelConnection
+from ..events.envelope import EventEnvelope
+from ..schemas import todo as todo_schema
+from .todo import TodoService, month_bounds
+
+
+async def build_snapshot(user_id: int, request: todo_schema.TodoSubscribeRequest) -> EventEnvelope:
+    # The cursor is read first, in the same transaction, so it never runs ahead of the data;
+    # replaying events past it is safe because every todo payload carries its version.
+    async with session_scope() as session:
+        service = TodoService(session)
+        cursor = await service.current_change_seq(user_id)
+        snapshot = todo_schema.TodoSnapshot(month=request.month, date=request.todo_local_date)
+        if request.month:
+            first_day, last_day = month_bounds(request.month)
+            summary = await service.monthly_summary(user_id, first_day, last_day)
+            snapshot.summary = [todo_schema.TodoSummary(todo_date=day, count=count) for day, count in summary]
+        if request.todo_local_date:
+            todos = await service.list_for_date(user_id, request.todo_local_date)
+            snapshot.todos = [todo_schema.TodoResponse.model_validate(todo) for todo in todos]
+    # Same field names as event payloads (model_dump() without aliases), e.g. todo_local_date.
+    return EventEnvelope("snapshot", snapshot.model_dump(), cursor)
+
+
+async def send_snapshot(
+    connection: ChannelConnection, user_id: int, request: todo_schema.TodoSubscribeRequest
+) -> None:
+    connection.pause()
+    try:
+        snapshot = await build_snapshot(user_id, request)
+        await connection.send_now(snapshot)
+    except Exception:
+        connection.resume()
+        raise
+    # Only the channel the socket was opened on carries this user's sequence.
+    connection.resume(snapshot.seq, connection.channel)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import json
+from typing import Optional
+
+from fastapi import HTTPException
+from pydantic import TypeAdapter, ValidationError
+
+from ..core.db import session_scope
+from ..events.bus import ChannelConnection, MessageHandler
+from ..events.envelope import EventEnvelope
+from ..schemas import todo as todo_schema
+from .public_cache import public_cache
+from .snapshot import send_snapshot
+
+_control_message = TypeAdapter(todo_schema.TodoControlMessage)
+
+
+async def authorize_channel(channel: str, principal_id: Optional[int]) -> bool:
+    kind, _, name = channel.partition(":")
+    if kind == "user":
+        return principal_id is not None and name == str(principal_id)
+    if kind == "calendar":
+        try:
+            async with session_scope() as db:
+                await public_cache.get_calendar(db, name)
+        except HTTPException:
+            return False
+        return True
+    return False
+
+
+# Control protocol for one socket following many channels:
+#   {"type": "subscribe", "channels": [...], "month"?: ..., "date"?: ...}
+#   {"type": "unsubscribe", "channels": [...]}
+# Both are answered with the socket's channel set; month/date still request a snapshot
+# of the user behind the channel the socket was opened on.
+def control_handler(user_id: int, principal_id: Optional[int] = None) -> MessageHandler:
+    async def handle(connection: ChannelConnection, text: str) -> None:
+        try:
+            message = json.loads(text)
+        except ValueError:
+            return
+        if not isinstance(message, dict) or message.get("type") not in ("subscribe", "unsubscribe"):
+            return
+        try:
+            request = _control_message.validate_python(message)
+        except ValidationError as exc:
+            await connection.send_now(EventEnvelope("error", {"detail": exc.errors(include_url=False)}))
+            return
+        if request.channels:
+            manager, rejected = connection.manager, []
+            for channel in request.channels:
+                if request.type == "unsubscribe":
+                    manager.unsubscribe(connection, channel)
+                elif channel in connection.channels:
+                    continue
+                elif not await authorize_channel(channel, principal_id):
+                    manager.rejected_subscriptions += 1
+                    rejected.append(channel)
+                elif not manager.subscribe(connection, channel):
+                    rejected.append(channel)
+            reply = {"channels": sorted(connection.channels), "rejected": rejected}
+            await connection.send_now(EventEnvelope(f"{request.type}d", reply))
+        if request.type == "subscribe" and (request.month or request.todo_local_date):
+            await send_snapshot(connection, user_id, request)
+
+    return handle
@@ -1,19 +1,140 @@
-from datetime import date
-from typing import Iterable, Sequence
+import base64
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional, Sequence
 
 from fastapi import HTTPException, status
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session
+from sqlalchemy import case, select, tuple_, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Executable, Update
 
+from ..core.config import get_settings
 from ..models.todo import Todo, TodoStatus
-from ..models.todo_audit import TodoAudit, TodoAuditAction
+from ..models.todo_audit import TodoAuditAction
+from ..models.todo_daily_count import TodoDailyCount
+from ..models.user import ShareMode, User
+from ..events.envelope import TODO_DELTA, EventEnvelope
+from ..schemas.todo import TodoResponse
+from .audit import audit_writer
+from .outbox import stage_event
+
+settings = get_settings()
+
+OPEN_STATUSES = (TodoStatus.PENDING, TodoStatus.PARTIAL)
+NEXT_STATUS = {
+    TodoStatus.PENDING: TodoStatus.DONE,
+    TodoStatus.DONE: TodoStatus.PARTIAL,
+    TodoStatus.PARTIAL: TodoStatus.PENDING,
+}
+PREVIOUS_STATUS = {after: before for before, after in NEXT_STATUS.items()}
+_NEXT_STATUS_SQL = case(
+    (Todo.status == TodoStatus.PENDING, TodoStatus.DONE),
+    (Todo.status == TodoStatus.DONE, TodoStatus.PARTIAL),
+    else_=TodoStatus.PENDING,
+)
+
+
+def is_open(todo_status: TodoStatus | None) -> bool:
+    return todo_status in OPEN_STATUSES
+
+
+def audit_row(
+    todo: Todo,
+    action: TodoAuditAction,
+    *,
+    from_status: TodoStatus | None = None,
+    to_status: TodoStatus | None = None,
+    editor_user_id: int | None = None,
+    editor_ip: str | None = None,
+    payload: dict | None = None,
+) -> dict:
+    return {
+        "todo_id": todo.id,
+        "action": action,
+        "from_status": from_status,
+        "to_status": to_status,
+        "editor_user_id": editor_user_id,
+        "editor_ip": editor_ip,
+        "payload": payload,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def _owned(user_id: int, todo_id: int) -> tuple:
+    return (Todo.id == todo_id, Todo.user_id == user_id, Todo.is_deleted.is_(False))
+
+
+def daily_count_upsert(dialect_name: str, user_id: int, local_date: date, delta: int) -> Executable:
+    values = {"user_id": user_id, "local_date": local_date, "open_count": delta}
+    if dialect_name == "mysql":
+        stmt = mysql.insert(TodoDailyCount).values(**values)
+        return stmt.on_duplicate_key_update(open_count=TodoDailyCount.open_count + delta)
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(TodoDailyCount).values(**values)
+    return stmt.on_conflict_do_update(
+        index_elements=[TodoDailyCount.user_id, TodoDailyCount.local_date],
+        set_={"open_count": TodoDailyCount.open_count + delta},
+    )
+
+
+MAX_RANGE_DAYS = 366
+
+
+def check_range(first_day: date, last_day: date) -> None:
+    if last_day < first_day:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="to must not be before from")
+    if (last_day - first_day).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Range is limited to one year")
+
+
+def month_bounds(month: str) -> tuple[date, date]:
+    year, month_value = map(int, month.split("-"))
+    first_day = date(year, month_value, 1)
+    if month_value == 12:
+        next_month = date(year + 1, 1, 1)
+    else:
+        next_month = date(year, month_value + 1, 1)
+    return first_day, next_month - timedelta(days=1)
+
+
+def encode_cursor(todo: Todo) -> str:
+    raw = f"{todo.todo_local_date.isoformat()}|{todo.created_at.isoformat()}|{todo.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def todo_event(event_type: str, todo: Todo, changed: Optional[Iterable[str]] = None) -> EventEnvelope:
+    # An edit that bumped the version by one goes out as a delta of the fields it touched;
+    # a client whose copy is not at base_version refetches the todo instead of applying it.
+    if changed is None or not settings.ws_delta_events:
+        return EventEnvelope(event_type, TodoResponse.model_validate(todo).model_dump(), todo.change_seq)
+    changes = {field: getattr(todo, field) for field in (*changed, "updated_at")}
+    payload = {"id": todo.id, "base_version": todo.version - 1, "version": todo.version, "changes": changes}
+    return EventEnvelope(TODO_DELTA, payload, todo.change_seq)
+
+
+def decode_cursor(cursor: str) -> tuple[date, datetime, int]:
+    try:
+        local_date, created_at, todo_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return date.fromisoformat(local_date), datetime.fromisoformat(created_at), int(todo_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+
+
+@dataclass
+class BatchResult:
+    op: str
+    status: str
+    todo: Optional[Todo] = None
+    detail: Optional[str] = None
 
 
 class TodoService:
-    def __init__(self, session: Session):
+    def __init__(self, session: AsyncSession):
         self.session = session
 
-    def list_for_date(self, user_id: int, target_date: date) -> Sequence[Todo]:
+    async def list_for_date(self, user_id: int, target_date: date) -> Sequence[Todo]:
         stmt = (
             select(Todo)
             .where(
@@ -23,62 +144,257 @@ class TodoService:
             )
             .order_by(Todo.created_at.asc())
         )
-        return self.session.execute(stmt).scalars().all()
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
 
-    def create(self, user_id: int, data: dict) -> Todo:
-        todo = Todo(user_id=user_id, **data)
+    async def list_range(
+        self, user_id: int, first_day: date, last_day: date, limit: int, cursor: Optional[str] = None
+    ) -> tuple[Sequence[Todo], Optional[str]]:
+        order = (Todo.todo_local_date, Todo.created_at, Todo.id)
+        stmt = (
+            select(Todo)
+            .where(
+                Todo.user_id == user_id,
+                Todo.is_deleted.is_(False),
+                Todo.todo_local_date >= first_day,
+                Todo.todo_local_date <= last_day,
+            )
+            .order_by(*order)
+            .limit(limit + 1)
+        )
+        if cursor:
+            stmt = stmt.where(tuple_(*order) > tuple_(*decode_cursor(cursor)))
+        result = await self.session.execute(stmt)
+        todos = result.scalars().all()
+        if len(todos) > limit:
+            todos = todos[:limit]
+            return todos, encode_cursor(todos[-1])
+        return todos, None
+
+    async def create(self, user_id: int, data: dict) -> Todo:
+        todo = Todo(user_id=user_id, change_seq=await self._next_change_seq(user_id), **data)
         self.session.add(todo)
-        self.session.flush()
-        self._audit(todo, TodoAuditAction.CREATE)
+        await self.session.flush()
+        if is_open(todo.status):
+            await self._adjust_daily_counts(user_id, {todo.todo_local_date: 1})
+        await self._audit(todo, TodoAuditAction.CREATE)
         return todo
 
-    def update(self, user_id: int, todo_id: int, data: dict, version: int) -> Todo:
-        todo = self._get_owned_todo(user_id, todo_id)
-        if todo.version != version:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Version mismatch")
-        for key, value in data.items():
-            setattr(todo, key, value)
-        todo.version += 1
-        self.session.add(todo)
-        self._audit(todo, TodoAuditAction.UPDATE)
+    async def update(self, user_id: int, todo_id: int, data: dict, version: int) -> Todo:
+        deltas: Counter[date] = Counter()
+        if "status" in data or "todo_local_date" in data:
+            # Only status/date moves need the old values; the version predicate below keeps this race-free.
+            result = await self.session.execute(
+                select(Todo.status, Todo.todo_local_date, Todo.version).where(*_owned(user_id, todo_id))
+            )
+            current = result.one_or_none()
+            if current is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
+            if current.version != version:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Version mismatch")
+            if is_open(current.status):
+                deltas[current.todo_local_date] -= 1
+            if is_open(data.get("status", current.status)):
+                deltas[data.get("todo_local_date", current.todo_local_date)] += 1
+        stmt = (
+            update(Todo)
+            .where(*_owned(user_id, todo_id), Todo.version == version)
+            .values(**data, version=Todo.version + 1, change_seq=await self._next_change_seq(user_id))
+        )
+        todo = await self._execute_update(stmt, user_id, todo_id)
+        await self._adjust_daily_counts(user_id, deltas)
+        await self._audit(todo, TodoAuditAction.UPDATE)
         return todo
 
-    def toggle_status(self, user_id: int, todo_id: int) -> Todo:
-        todo = self._get_owned_todo(user_id, todo_id)
-        next_status = {
-            TodoStatus.PENDING: TodoStatus.DONE,
-            TodoStatus.DONE: TodoStatus.PARTIAL,
-            TodoStatus.PARTIAL: TodoStatus.PENDING,
-        }[todo.status]
-        previous_status = todo.status
-        todo.status = next_status
-        todo.version += 1
-        self.session.add(todo)
-        self._audit(todo, TodoAuditAction.TOGGLE, from_status=previous_status, to_status=next_status)
+    async def toggle_status(self, user_id: int, todo_id: int, version: int | None = None) -> Todo:
+        stmt = (
+            update(Todo)
+            .where(*_owned(user_id, todo_id))
+            .values(
+                status=_NEXT_STATUS_SQL,
+                version=Todo.version + 1,
+                change_seq=await self._next_change_seq(user_id),
+            )
+        )
+        if version is not None:
+            stmt = stmt.where(Todo.version == version)
+        todo = await self._execute_update(stmt, user_id, todo_id)
+        next_status = todo.status
+        previous_status = PREVIOUS_STATUS[next_status]
+        delta = int(is_open(next_status)) - int(is_open(previous_status))
+        await self._adjust_daily_counts(user_id, {todo.todo_local_date: delta})
+        await self._audit(todo, TodoAuditAction.TOGGLE, from_status=previous_status, to_status=next_status)
         return todo
 
-    def monthly_summary(self, user_id: int, first_day: date, last_day: date) -> Iterable[tuple[date, int]]:
+    async def apply_batch(self, user_id: int, operations: list[dict]) -> list[BatchResult]:
+        ids = {operation["id"] for operation in operations if operation["op"] != "create"}
+        rows: dict[int, Todo] = {}
+        if ids:
+            # The user row is locked before the todos, the order create/update/toggle_status
+            # take them in via _next_change_seq, so a batch and a single edit cannot deadlock.
+            await self.session.execute(select(User.id).where(User.id == user_id).with_for_update())
+            result = await self.session.execute(
+                select(Todo)
+                .where(Todo.id.in_(ids), Todo.user_id == user_id, Todo.is_deleted.is_(False))
+                .with_for_update()
+            )
+            rows = {todo.id: todo for todo in result.scalars()}
+
+        results: list[BatchResult] = []
+        created: list[Todo] = []
+        audits: list[tuple[Todo, TodoAuditAction, TodoStatus | None, TodoStatus | None]] = []
+        deltas: Counter[date] = Counter()
+        for operation in operations:
+            fields = {key: value for key, value in operation.items() if key not in ("op", "id", "version")}
+            kind = operation["op"]
+            if kind == "create":
+                todo = Todo(user_id=user_id, status=TodoStatus.PENDING, version=1, **fields)
+                created.append(todo)
+                deltas[todo.todo_local_date] += 1
+                audits.append((todo, TodoAuditAction.CREATE, None, None))
+                results.append(BatchResult(kind, "ok", todo))
+                continue
+
+            todo = rows.get(operation["id"])
+            if todo is None or todo.is_deleted:
+                results.append(BatchResult(kind, "not_found", detail="Todo not found"))
+                continue
+            expected_version = operation.get("version")
+            if expected_version is not None and expected_version != todo.version:
+                results.append(BatchResult(kind, "conflict", todo, "Version mismatch"))
+                continue
+
+            previous_status = todo.status
+            if is_open(previous_status):
+                deltas[todo.todo_local_date] -= 1
+            if kind == "update":
+                for key, value in fields.items():
+                    setattr(todo, key, value)
+                audits.append((todo, TodoAuditAction.UPDATE, None, None))
+            elif kind == "toggle":
+                todo.status = NEXT_STATUS[previous_status]
+                audits.append((todo, TodoAuditAction.TOGGLE, previous_status, todo.status))
+            else:
+                todo.is_deleted = True
+                audits.append((todo, TodoAuditAction.DELETE, previous_status, None))
+            todo.version += 1
+            if is_open(todo.status) and not todo.is_deleted:
+                deltas[todo.todo_local_date] += 1
+            results.append(BatchResult(kind, "ok", todo))
+
+        applied = [result.todo for result in results if result.status == "ok"]
+        if applied:
+            change_seq = await self._next_change_seq(user_id)
+            for todo in applied:
+                todo.change_seq = change_seq
+        self.session.add_all(created)
+        await self.session.flush()
+        await audit_writer.write(
+            self.session,
+            [
+                audit_row(todo, action, from_status=before, to_status=after)
+                for todo, action, before, after in audits
+            ],
+        )
+        await self._adjust_daily_counts(user_id, deltas)
+        return results
+
+    async def list_changes(self, user_id: int, since: int, until: int, limit: int) -> tuple[Sequence[Todo], bool]:
         stmt = (
-            select(Todo.todo_local_date, func.count(Todo.id))
+            select(Todo)
+            .where(Todo.user_id == user_id, Todo.change_seq > since, Todo.change_seq <= until)
+            .order_by(Todo.change_seq, Todo.id)
+            .limit(limit + 1)
+        )
+        result = await self.session.execute(stmt)
+        todos = result.scalars().all()
+        if len(todos) <= limit:
+            return todos, False
+        # Never split rows that share a sequence number (one batch) across pages.
+        boundary = todos[limit].change_seq
+        page = [todo for todo in todos[:limit] if todo.change_seq != boundary]
+        if not page:
+            result = await self.session.execute(
+                select(Todo).where(Todo.user_id == user_id, Todo.change_seq == boundary).order_by(Todo.id)
+            )
+            page = result.scalars().all()
+        return page, True
+
+    async def owner_channels(self, user_id: int) -> list[str]:
+        # A shared calendar gets the owner's edits too, so its subscribers see every change_seq.
+        # Same order as public toggles, so both go through one coalescing target.
+        result = await self.session.execute(select(User.share_mode, User.public_slug).where(User.id == user_id))
+        share_mode, public_slug = result.one()
+        if share_mode is ShareMode.PRIVATE or not public_slug:
+            return [f"user:{user_id}"]
+        return [f"calendar:{public_slug}", f"user:{user_id}"]
+
+    def emit(self, channels: str | Iterable[str], event: EventEnvelope) -> None:
+        # Written in the caller's transaction; the outbox dispatcher publishes it after commit.
+        stage_event(self.session, channels, event)
+
+    async def current_change_seq(self, user_id: int) -> int:
+        result = await self.session.execute(select(User.change_seq).where(User.id == user_id))
+        return result.scalar_one()
+
+    async def monthly_summary(self, user_id: int, first_day: date, last_day: date) -> Iterable[tuple[date, int]]:
+        return await self.range_summary(user_id, first_day, last_day)
+
+    async def range_summary(self, user_id: int, first_day: date, last_day: date) -> Iterable[tuple[date, int]]:
+        stmt = (
+            select(TodoDailyCount.local_date, TodoDailyCount.open_count)
             .where(
-                Todo.user_id == user_id,
-                Todo.todo_local_date >= first_day,
-                Todo.todo_local_date <= last_day,
-                Todo.status.in_([TodoStatus.PENDING, TodoStatus.PARTIAL]),
-                Todo.is_deleted.is_(False),
+                TodoDailyCount.user_id == user_id,
+                TodoDailyCount.local_date >= first_day,
+                TodoDailyCount.local_date <= last_day,
+                TodoDailyCount.open_count > 0,
             )
-            .group_by(Todo.todo_local_date)
-            .order_by(Todo.todo_local_date)
+            .order_by(TodoDailyCount.local_date)
         )
-        return [(row[0], row[1]) for row in self.session.execute(stmt).all()]
+        result = await self.session.execute(stmt)
+        return [(row[0], row[1]) for row in result.all()]
 
-    def _get_owned_todo(self, user_id: int, todo_id: int) -> Todo:
-        todo = self.session.get(Todo, todo_id)
-        if not todo or todo.user_id != user_id or todo.is_deleted:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
+    async def _next_change_seq(self, user_id: int) -> int:
+        # The row lock taken here also orders concurrent writers of the same user by commit.
+        stmt = (
+            update(User)
+            .where(User.id == user_id)
+            .values(change_seq=User.change_seq + 1, updated_at=User.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        if self.session.bind.dialect.update_returning:
+            result = await self.session.execute(stmt.returning(User.change_seq))
+            return result.scalar_one()
+        await self.session.execute(stmt)
+        return await self.current_change_seq(user_id)
+
+    async def _adjust_daily_counts(self, user_id: int, deltas: dict[date, int]) -> None:
+        dialect_name = self.session.bind.dialect.name
+        for local_date, delta in deltas.items():
+            if delta:
+                await self.session.execute(daily_count_upsert(dialect_name, user_id, local_date, delta))
+
+    async def _execute_update(self, stmt: Update, user_id: int, todo_id: int) -> Todo:
+        stmt = stmt.execution_options(synchronize_session=False)
+        if self.session.bind.dialect.update_returning:
+            result = await self.session.execute(
+                stmt.returning(Todo), execution_options={"populate_existing": True}
+            )
+            todo = result.scalar_one_or_none()
+        else:
+            result = await self.session.execute(stmt)
+            todo = await self.session.get(Todo, todo_id, populate_existing=True) if result.rowcount else None
+        if todo is None:
+            await self._raise_update_conflict(user_id, todo_id)
         return todo
 
-    def _audit(
+    async def _raise_update_conflict(self, user_id: int, todo_id: int) -> None:
+        result = await self.session.execute(select(Todo.version).where(*_owned(user_id, todo_id)))
+        if result.scalar_one_or_none() is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Version mismatch")
+
+    async def _audit(
         self,
         todo: Todo,
         action: TodoAuditAction,
@@ -88,12 +404,12 @@ class TodoService:
         editor_user_id: int | None = None,
         payload: dict | None = None,
     ) -> None:
-        audit = TodoAudit(
-            todo_id=todo.id,
-            action=action,
+        row = audit_row(
+            todo,
+            action,
             from_status=from_status,
             to_status=to_status,
             editor_user_id=editor_user_id,
             payload=payload,
         )
-        self.session.add(audit)
+        await audit_writer.write(self.session, [row])
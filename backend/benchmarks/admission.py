@@ -0,0 +1,92 @@
+"""Per-request cost of rate limiting and load shedding.
+
+Times the in-memory token bucket on a hot key and across many keys, a full
+``RateLimiter.check`` for a public read and write, and ``LoadShedder.admit``. Pass
+``--redis-url`` to include a round trip through the Redis bucket script::
+
+    python -m benchmarks.admission --ops 200000
+    python -m benchmarks.admission --redis-url redis://127.0.0.1:6379/0
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from starlette.requests import Request
+
+from app.core.admission import LoadShedder, MemoryBucketStore, RateLimiter, RedisBucketStore
+from app.core.config import get_settings
+from app.core.metrics import DecayingMax, LoopLagMonitor
+
+
+def request_from(ip: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "client": (ip, 50000)})
+
+
+def per_op_us(started: float, ops: int) -> float:
+    return round((time.perf_counter() - started) / ops * 1e6, 3)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    settings = get_settings()
+    results = {}
+
+    store = MemoryBucketStore(args.keys)
+    hot = [("read:ip:10.0.0.1", 1e9, 1e9), ("read:slug:team", 1e9, 1e9)]
+    started = time.perf_counter()
+    for _ in range(args.ops):
+        await store.acquire(hot)
+    results["memory_hot_key_us"] = per_op_us(started, args.ops)
+
+    keys = [(f"read:ip:10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}", 5.0, 10.0) for index in range(args.keys)]
+    started = time.perf_counter()
+    for _ in range(args.ops):
+        await store.acquire([random.choice(keys)])
+    results["memory_many_keys_us"] = per_op_us(started, args.ops)
+    results["memory_tracked_keys"] = len(store.buckets)
+
+    limiter = RateLimiter(settings, MemoryBucketStore(args.keys))
+    limiter.enabled = True
+    requests = [request_from(f"10.1.{index >> 8 & 255}.{index & 255}") for index in range(1000)]
+    for scope, token in (("read", None), ("write", "edit-token")):
+        started = time.perf_counter()
+        for index in range(args.ops):
+            try:
+                await limiter.check(scope, requests[index % len(requests)], "team", token)
+            except Exception:  # noqa: BLE001 - throttled calls cost the same to decide
+                pass
+        results[f"check_{scope}_us"] = per_op_us(started, args.ops)
+
+    shedder = LoadShedder(settings, LoopLagMonitor(0), DecayingMax(1.0))
+    started = time.perf_counter()
+    for _ in range(args.ops):
+        shedder.admit()
+    results["shedder_admit_us"] = per_op_us(started, args.ops)
+
+    if args.redis_url:
+        redis_store = RedisBucketStore(args.redis_url, prefix=f"bench-{random.getrandbits(32):08x}")
+        ops = min(args.ops, args.redis_ops)
+        started = time.perf_counter()
+        for index in range(ops):
+            await redis_store.acquire([(f"read:ip:{index % 1000}", 1e6, 1e6), ("read:slug:team", 1e6, 1e6)])
+        results["redis_acquire_us"] = per_op_us(started, ops)
+        results["redis_errors"] = redis_store.errors
+        await redis_store.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=200_000)
+    parser.add_argument("--keys", type=int, default=100_000, help="distinct client keys in the many-keys run")
+    parser.add_argument("--redis-url")
+    parser.add_argument("--redis-ops", type=int, default=20_000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
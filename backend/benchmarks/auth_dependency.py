@@ -0,0 +1,71 @@
+"""Cost of the authenticated-request dependency with and without the principal cache.
+
+Uses the configured DATABASE_URL (create tables first with ``python -m app.db.init_db``)::
+
+    DATABASE_URL=mysql+pymysql://... JWT_SECRET=x python -m benchmarks.auth_dependency --calls 5000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+from fastapi import Response
+
+from app.core.db import engine, session_scope
+from app.dependencies import get_current_principal, get_current_user
+from app.models.user import User
+from app.services.auth import AuthService
+from app.services.principal_cache import principal_cache
+
+
+async def seed() -> str:
+    async with session_scope() as session:
+        user = User(email=f"auth-{uuid.uuid4().hex[:12]}@example.com", password_hash="-")
+        session.add(user)
+        await session.flush()
+        return AuthService(session).issue_token(user)
+
+
+async def measure(calls: int, token: str, mode: str) -> dict:
+    timings = []
+    for _ in range(calls):
+        if mode == "uncached":
+            principal_cache.principals.clear()
+        started = time.perf_counter()
+        async with session_scope() as session:
+            if mode == "full_user":
+                await get_current_user(token, session)
+            else:
+                await get_current_principal(Response(), token, session)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    timings.sort()
+    return {
+        "mode": mode,
+        "calls": calls,
+        "mean_us": round(statistics.fmean(timings), 1),
+        "p50_us": round(timings[len(timings) // 2], 1),
+        "p99_us": round(timings[int(len(timings) * 0.99) - 1], 1),
+    }
+
+
+async def run(calls: int) -> list[dict]:
+    token = await seed()
+    results = [await measure(calls, token, mode) for mode in ("full_user", "uncached", "cached")]
+    results.append({"principal_cache": principal_cache.snapshot()})
+    await engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.calls)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
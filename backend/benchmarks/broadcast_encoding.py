@@ -0,0 +1,77 @@
+"""CPU cost per broadcast event: per-subscriber ``send_json`` vs. encode-once envelopes.
+
+Run from ``backend/``::
+
+    python -m benchmarks.broadcast_encoding --subscribers 1000 10000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import date, datetime, timezone
+
+from app.events.envelope import EventEnvelope
+
+
+def _payload() -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        "id": 42,
+        "title": "Study",
+        "description": "Read 20 pages " * 20,
+        "todo_local_date": date.today(),
+        "status": "DONE",
+        "version": 7,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def per_subscriber(subscribers: int, channels: int) -> None:
+    # Mirrors the old path: one dict per publish, json-encoded inside every send_json.
+    message = {"type": "todo_toggled", "payload": _payload()}
+    for _ in range(channels):
+        for _ in range(subscribers):
+            json.dumps(message, default=str, separators=(",", ":"))
+
+
+def encode_once(subscribers: int, channels: int) -> None:
+    event = EventEnvelope("todo_toggled", _payload())
+    for _ in range(channels):
+        for _ in range(subscribers):
+            event.text
+
+
+def measure(fn, subscribers: int, channels: int, repeat: int) -> float:
+    started = time.process_time()
+    for _ in range(repeat):
+        fn(subscribers, channels)
+    return (time.process_time() - started) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--channels", type=int, default=2, help="target channels per event (public toggle = 2)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    results = []
+    for subscribers in args.subscribers:
+        before = measure(per_subscriber, subscribers, args.channels, args.repeat)
+        after = measure(encode_once, subscribers, args.channels, args.repeat)
+        results.append(
+            {
+                "subscribers": subscribers,
+                "channels": args.channels,
+                "per_subscriber_cpu_ms": round(before * 1000, 3),
+                "encode_once_cpu_ms": round(after * 1000, 3),
+                "speedup": round(before / after, 1) if after else None,
+            }
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
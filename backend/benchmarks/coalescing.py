@@ -0,0 +1,70 @@
+"""Frames sent for a click storm on a public calendar, with and without coalescing.
+
+Replays ``--clicks`` toggles spread over ``--todos`` todos, one every ``--interval``
+seconds, published to ``calendar:<slug>`` and ``user:<id>`` like a public toggle,
+against ``--subscribers`` in-process sockets on the calendar channel::
+
+    python -m benchmarks.coalescing --window 0.05 --clicks 200 --interval 0.01
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import asdict
+
+from app.events.backends import BroadcastBackend
+from app.events.bus import WebSocketManager
+from app.events.envelope import EventEnvelope
+
+from .ws_registry import NullWebSocket
+
+
+async def storm(args: argparse.Namespace, window: float) -> dict:
+    manager = WebSocketManager(backend=BroadcastBackend(), coalesce_window=window)
+    for _ in range(args.subscribers):
+        await manager.connect(NullWebSocket(), "calendar:team")
+    NullWebSocket.sent = 0
+    versions = dict.fromkeys(range(args.todos), 0)
+    started = time.perf_counter()
+    for seq in range(1, args.clicks + 1):
+        todo_id = random.randrange(args.todos)
+        versions[todo_id] += 1
+        event = EventEnvelope("todo_toggled", {"id": todo_id, "version": versions[todo_id]}, seq)
+        await manager.publish(["calendar:team", "user:1"], event)
+        await asyncio.sleep(args.interval)
+    await asyncio.sleep(max(window, 0) * 2 + 0.05)
+    result = {
+        "window_s": window,
+        "seconds": round(time.perf_counter() - started, 3),
+        "socket_frames_sent": NullWebSocket.sent,
+    }
+    if manager.coalescer is not None:
+        result.update(asdict(manager.coalescer.stats["calendar"]))
+    return result
+
+
+async def run(args: argparse.Namespace) -> list[dict]:
+    random.seed(args.seed)
+    baseline = await storm(args, 0)
+    random.seed(args.seed)
+    coalesced = await storm(args, args.window)
+    return [baseline, coalesced]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--window", type=float, default=0.05)
+    parser.add_argument("--subscribers", type=int, default=200)
+    parser.add_argument("--todos", type=int, default=5)
+    parser.add_argument("--clicks", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between clicks")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
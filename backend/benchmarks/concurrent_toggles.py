@@ -0,0 +1,86 @@
+"""Many parallel toggles on one row: checks for lost updates and reports throughput.
+
+Uses the configured DATABASE_URL (create tables first with ``python -m app.db.init_db``)::
+
+    DATABASE_URL=mysql+pymysql://... JWT_SECRET=x python -m benchmarks.concurrent_toggles --toggles 1000 --concurrency 50
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import date
+
+from sqlalchemy import func, select
+
+from app.core.db import engine, session_scope
+from app.models.todo import Todo, TodoStatus
+from app.models.todo_audit import TodoAudit, TodoAuditAction
+from app.models.user import User
+from app.services.todo import NEXT_STATUS, TodoService
+
+
+async def seed() -> tuple[int, int]:
+    async with session_scope() as session:
+        user = User(email=f"toggle-{uuid.uuid4().hex[:12]}@example.com", password_hash="-")
+        session.add(user)
+        await session.flush()
+        todo = await TodoService(session).create(user.id, {"title": "hot row", "todo_local_date": date.today()})
+        return user.id, todo.id
+
+
+async def toggle(user_id: int, todo_id: int, semaphore: asyncio.Semaphore) -> bool:
+    async with semaphore:
+        try:
+            async with session_scope() as session:
+                await TodoService(session).toggle_status(user_id, todo_id)
+            return True
+        except Exception:  # noqa: BLE001 - counted as a failed attempt (e.g. lock timeout)
+            return False
+
+
+async def run(toggles: int, concurrency: int) -> dict:
+    user_id, todo_id = await seed()
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(toggle(user_id, todo_id, semaphore) for _ in range(toggles)))
+    elapsed = time.perf_counter() - started
+    succeeded = sum(outcomes)
+
+    async with session_scope() as session:
+        todo = await session.get(Todo, todo_id)
+        audits = await session.scalar(
+            select(func.count(TodoAudit.id)).where(
+                TodoAudit.todo_id == todo_id, TodoAudit.action == TodoAuditAction.TOGGLE
+            )
+        )
+    expected_status = TodoStatus.PENDING
+    for _ in range(succeeded):
+        expected_status = NEXT_STATUS[expected_status]
+    await engine.dispose()
+    return {
+        "toggles": toggles,
+        "concurrency": concurrency,
+        "succeeded": succeeded,
+        "failed": toggles - succeeded,
+        "elapsed_s": round(elapsed, 3),
+        "toggles_per_s": round(succeeded / elapsed, 1),
+        "final_version": todo.version,
+        "audit_rows": audits,
+        "lost_updates": (1 + succeeded) - todo.version,
+        "status_consistent": todo.status == expected_status and audits == succeeded,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--toggles", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.toggles, args.concurrency)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
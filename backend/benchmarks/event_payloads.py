@@ -0,0 +1,95 @@
+"""Bytes and CPU per event on the toggle path: full payloads against deltas, raw and deflated.
+
+Replays ``--events`` toggles over ``--todos`` in-memory todos whose descriptions are
+``--description-bytes`` long, builds each event the way the toggle routes do and encodes
+it once, then compresses the frames as one socket's permessage-deflate stream would, with
+and without context takeover::
+
+    python -m benchmarks.event_payloads --events 20000 --description-bytes 400
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import string
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from websockets.extensions.permessage_deflate import PerMessageDeflate
+from websockets.frames import Frame, Opcode
+
+from app.core.config import get_settings
+from app.models.todo import Todo, TodoStatus
+from app.services.todo import NEXT_STATUS, todo_event
+
+
+def seed(args: argparse.Namespace) -> list[Todo]:
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        Todo(
+            id=index + 1,
+            user_id=1,
+            title=f"todo {index}",
+            description="".join(random.choices(string.ascii_letters + " ", k=args.description_bytes)),
+            todo_local_date=date(2024, 1, 1) + timedelta(days=index % 28),
+            status=TodoStatus.PENDING,
+            version=1,
+            change_seq=0,
+            created_at=created,
+            updated_at=created,
+        )
+        for index in range(args.todos)
+    ]
+
+
+def per_event_us(seconds: float, events: int) -> float:
+    return round(seconds / events * 1e6, 3)
+
+
+def deflated(frames: list[bytes], no_context_takeover: bool) -> tuple[float, float]:
+    extension = PerMessageDeflate(no_context_takeover, no_context_takeover, 15, 15)
+    total = 0
+    started = time.perf_counter()
+    for data in frames:
+        total += len(extension.encode(Frame(Opcode.TEXT, data)).data)
+    return round(total / len(frames), 1), per_event_us(time.perf_counter() - started, len(frames))
+
+
+def toggles(args: argparse.Namespace, delta: bool) -> dict:
+    random.seed(args.seed)
+    todos = seed(args)
+    changed = ("status",) if delta else None
+    frames = []
+    build = 0.0
+    for seq in range(1, args.events + 1):
+        todo = random.choice(todos)
+        todo.status = NEXT_STATUS[todo.status]
+        todo.version += 1
+        todo.updated_at += timedelta(seconds=1)
+        todo.change_seq = seq
+        started = time.perf_counter()
+        frames.append(todo_event("todo_toggled", todo, changed).data)
+        build += time.perf_counter() - started
+    result = {
+        "bytes_raw": round(sum(map(len, frames)) / len(frames), 1),
+        "build_encode_us": per_event_us(build, len(frames)),
+    }
+    result["bytes_deflate"], result["deflate_us"] = deflated(frames, False)
+    result["bytes_deflate_no_takeover"], result["deflate_no_takeover_us"] = deflated(frames, True)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20_000)
+    parser.add_argument("--todos", type=int, default=200)
+    parser.add_argument("--description-bytes", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    get_settings().ws_delta_events = True
+    print(json.dumps({"full": toggles(args, False), "delta": toggles(args, True)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
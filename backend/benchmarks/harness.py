@@ -0,0 +1,112 @@
+"""Pieces shared by the load benchmarks and the multi-instance tests.
+
+Spawning a server on a free port, waiting for it, seeding a user with a public calendar and
+summarizing latency samples.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PASSWORD = "bench-password"
+# Spawned servers only serve /metrics behind a token.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "load-suite")
+
+
+@dataclass
+class SeededUser:
+    email: str
+    headers: dict
+    token: str
+    slug: str
+    edit_token: str
+    todo_ids: list[int]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database_url: str, port: int, **env: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "JWT_SECRET": os.environ.get("JWT_SECRET", "load-suite"),
+        "PASSWORD_HASH_ROUNDS": os.environ.get("PASSWORD_HASH_ROUNDS", "4"),
+        # Every simulated client shares one IP, which the per-IP budgets would throttle.
+        "RATE_LIMIT_ENABLED": os.environ.get("RATE_LIMIT_ENABLED", "false"),
+        "METRICS_TOKEN": METRICS_TOKEN,
+        **env,
+    }
+    subprocess.run([sys.executable, "-m", "app.db.init_db"], cwd=BACKEND_DIR, env=env, check=True)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{client.base_url} did not become ready")
+
+
+async def seed_user(client: httpx.AsyncClient, todos: int) -> SeededUser:
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    await client.post("/auth/register", json={"email": email, "password": PASSWORD, "name": None})
+    login = await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+    token = login.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    slug, edit_token = f"bench-{uuid.uuid4().hex[:12]}", uuid.uuid4().hex
+    await client.put(
+        "/sharing", json={"share_mode": "public_edit", "public_slug": slug, "edit_token": edit_token}, headers=headers
+    )
+    today = date.today().isoformat()
+    ids: list[int] = []
+    for start in range(0, todos, 500):
+        operations = [
+            {"op": "create", "title": f"todo {index}", "description": "", "todo_date": today}
+            for index in range(start, min(todos, start + 500))
+        ]
+        response = await client.post("/todos/batch", json={"operations": operations}, headers=headers)
+        ids.extend(result["todo"]["id"] for result in response.json()["results"])
+    return SeededUser(email, headers, token, slug, edit_token, ids)
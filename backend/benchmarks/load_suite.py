@@ -0,0 +1,283 @@
+"""Self-contained REST + WebSocket load suite with machine-readable results.
+
+By default it creates a throwaway SQLite database, starts ``uvicorn app.main:app`` against it,
+seeds users and todos, holds WebSocket subscribers on every ``user:`` and ``calendar:``
+channel and drives a weighted create/toggle/public_toggle/list/summary mix::
+
+    python -m benchmarks.load_suite run --users 20 --todos-per-user 50 --workers 32 --output before.json
+    python -m benchmarks.load_suite run --database-url mysql+pymysql://u:p@127.0.0.1/todo_bench --output after.json
+    python -m benchmarks.load_suite run --base-url http://127.0.0.1:8000   # reuse a server you started
+    python -m benchmarks.load_suite compare before.json after.json
+
+REST latency while public sockets listen, against a server you started (a lighter mix on one
+calendar, no ``user:`` subscribers)::
+
+    python -m benchmarks.load_suite run --base-url http://127.0.0.1:8000 --users 1 --user-subscribers 0 \
+        --calendar-subscribers 200 --mix list=1,toggle=1,summary=1,public_toggle=1
+
+Publish-to-receive delay is measured from the moment a mutating request is sent to the moment
+each subscriber receives the matching ``(id, version)`` event.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import httpx
+import websockets
+
+from .harness import BACKEND_DIR, SeededUser, free_port, seed_user, start_server, summarize, wait_ready
+
+DEFAULT_MIX = "create=1,toggle=4,public_toggle=2,list=4,summary=1"
+EventKey = tuple[str, int, int]
+
+
+@dataclass
+class Recorder:
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+    errors: dict[str, int] = field(default_factory=dict)
+    sent: dict[EventKey, float] = field(default_factory=dict)
+    received: list[tuple[EventKey, float]] = field(default_factory=list)
+    ws_connect_errors: int = 0
+    ws_deflate_sockets: int = 0
+
+    def request(self, op: str, started: float, response: httpx.Response) -> None:
+        self.latencies.setdefault(op, []).append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[f"{op}:{response.status_code}"] = self.errors.get(f"{op}:{response.status_code}", 0) + 1
+
+    def published(self, channel: str, started: float, response: httpx.Response) -> None:
+        if response.status_code < 400:
+            body = response.json()
+            self.sent[(channel, body["id"], body["version"])] = started
+
+    def delays(self) -> list[float]:
+        return [received - self.sent[key] for key, received in self.received if key in self.sent]
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def subscriber(
+    url: str, channel: str, headers: dict, compression: Optional[str], recorder: Recorder, stop: asyncio.Event
+) -> None:
+    try:
+        async with websockets.connect(url, additional_headers=headers, compression=compression) as socket:
+            if socket.protocol.extensions:
+                recorder.ws_deflate_sockets += 1
+            while not stop.is_set():
+                try:
+                    frame = await asyncio.wait_for(socket.recv(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                received = time.perf_counter()
+                message = json.loads(frame)
+                # Coalesced frames (ws_coalesce_window_seconds > 0) carry several events.
+                events = message["payload"]["events"] if message.get("type") == "batch" else [message]
+                for event in events:
+                    payload = event.get("payload") or {}
+                    if "id" in payload and "version" in payload:
+                        recorder.received.append(((channel, payload["id"], payload["version"]), received))
+    except (OSError, websockets.WebSocketException):
+        recorder.ws_connect_errors += 1
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    users: list[SeededUser],
+    mix: dict[str, int],
+    deadline: float,
+    recorder: Recorder,
+) -> None:
+    ops, weights = list(mix), list(mix.values())
+    today = date.today()
+    month = today.strftime("%Y-%m")
+    while time.perf_counter() < deadline:
+        user = random.choice(users)
+        op = random.choices(ops, weights)[0]
+        started = time.perf_counter()
+        if op == "create":
+            response = await client.post(
+                "/todos", json={"title": "load", "description": "", "todo_date": today.isoformat()}, headers=user.headers
+            )
+            if response.status_code < 400:
+                user.todo_ids.append(response.json()["id"])
+            channel = "user"
+        elif op == "toggle":
+            response = await client.post(f"/todos/{random.choice(user.todo_ids)}/toggle", headers=user.headers)
+            channel = "user"
+        elif op == "public_toggle":
+            response = await client.post(
+                f"/public/{user.slug}/todos/{random.choice(user.todo_ids)}/toggle", params={"edit_token": user.edit_token}
+            )
+            channel = "calendar"
+        elif op == "list":
+            response = await client.get("/todos", params={"date": today.isoformat()}, headers=user.headers)
+            channel = None
+        else:
+            response = await client.get("/todos/summary/month", params={"month": month}, headers=user.headers)
+            channel = None
+        recorder.request(op, started, response)
+        if channel is not None:
+            recorder.published(channel, started, response)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    server = None
+    base_url = args.base_url
+    database_url = args.database_url
+    if base_url is None:
+        if database_url is None:
+            database_url = f"sqlite:///{tempfile.mkdtemp(prefix='todo-sync-bench-')}/bench.db"
+        port = free_port()
+        server = start_server(database_url, port)
+        base_url = f"http://127.0.0.1:{port}"
+    recorder = Recorder()
+    mix = parse_mix(args.mix)
+    try:
+        limits = httpx.Limits(max_connections=args.workers * 2)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            await wait_ready(client)
+            users = [await seed_user(client, args.todos_per_user) for _ in range(args.users)]
+
+            ws_base = base_url.replace("http", "ws", 1)
+            stop = asyncio.Event()
+            compression = None if args.compression == "none" else args.compression
+            subscribers = []
+            for user in users:
+                for _ in range(args.user_subscribers):
+                    url = f"{ws_base}/ws/user?token={user.token}"
+                    subscribers.append(subscriber(url, "user", user.headers, compression, recorder, stop))
+                for _ in range(args.calendar_subscribers):
+                    subscribers.append(subscriber(
+                        f"{ws_base}/public/ws/{user.slug}", "calendar", {}, compression, recorder, stop
+                    ))
+            tasks = [asyncio.create_task(coro) for coro in subscribers]
+            await asyncio.sleep(args.warmup)
+
+            started = time.perf_counter()
+            deadline = started + args.duration
+            await asyncio.gather(*(worker(client, users, mix, deadline, recorder) for _ in range(args.workers)))
+            elapsed = time.perf_counter() - started
+            await asyncio.sleep(args.drain)
+            stop.set()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    samples = [sample for values in recorder.latencies.values() for sample in values]
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "base_url": base_url,
+            "database": database_url.split("://", 1)[0] if database_url else "external",
+        },
+        "config": {
+            "users": args.users,
+            "todos_per_user": args.todos_per_user,
+            "workers": args.workers,
+            "user_subscribers": args.user_subscribers,
+            "calendar_subscribers": args.calendar_subscribers,
+            "duration_s": args.duration,
+            "mix": mix,
+            "ws_compression": args.compression,
+        },
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "errors": recorder.errors,
+        "ws_connect_errors": recorder.ws_connect_errors,
+        "ws_deflate_sockets": recorder.ws_deflate_sockets,
+        "ws_frames_received": len(recorder.received),
+        "overall": summarize(samples),
+        "by_operation": {op: summarize(values) for op, values in sorted(recorder.latencies.items())},
+        "publish_to_receive": summarize(recorder.delays()),
+    }
+
+
+def _flatten(result: dict) -> dict[str, float]:
+    metrics = {"throughput_rps": result["throughput_rps"]}
+    for section in ("overall", "publish_to_receive"):
+        for name, value in result[section].items():
+            metrics[f"{section}.{name}"] = value
+    for op, values in result["by_operation"].items():
+        for name in ("p50_ms", "p95_ms", "p99_ms"):
+            metrics[f"{op}.{name}"] = values[name]
+    return metrics
+
+
+def compare(baseline_path: str, candidate_path: str) -> dict:
+    baseline = json.loads(Path(baseline_path).read_text())
+    candidate = json.loads(Path(candidate_path).read_text())
+    before, after = _flatten(baseline), _flatten(candidate)
+    rows = {}
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name], after[name]
+        change = round((new - old) / old * 100, 1) if old else None
+        rows[name] = {"baseline": old, "candidate": new, "change_pct": change}
+    return {
+        "baseline": baseline["meta"].get("revision"),
+        "candidate": candidate["meta"].get("revision"),
+        "metrics": rows,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="seed, load and report")
+    run_parser.add_argument("--base-url", help="target an already running server instead of spawning one")
+    run_parser.add_argument("--database-url", help="database for the spawned server (default: temporary SQLite)")
+    run_parser.add_argument("--users", type=int, default=10)
+    run_parser.add_argument("--todos-per-user", type=int, default=50)
+    run_parser.add_argument("--workers", type=int, default=32)
+    run_parser.add_argument("--user-subscribers", type=int, default=5, help="sockets per user: channel")
+    run_parser.add_argument("--calendar-subscribers", type=int, default=20, help="sockets per calendar: channel")
+    run_parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted operations (default {DEFAULT_MIX})")
+    run_parser.add_argument("--duration", type=float, default=30.0)
+    run_parser.add_argument("--warmup", type=float, default=1.0)
+    run_parser.add_argument("--drain", type=float, default=1.0, help="seconds to keep receiving after load stops")
+    run_parser.add_argument(
+        "--compression", choices=("deflate", "none"), default="deflate", help="permessage-deflate offer of subscribers"
+    )
+    run_parser.add_argument("--output", help="also write the JSON result to this path")
+    compare_parser = commands.add_parser("compare", help="diff two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        print(json.dumps(compare(args.baseline, args.candidate), indent=2))
+        return
+    result = asyncio.run(run(args))
+    output = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Login throughput against a running server, with WebSocket ping latency sampled alongside.
+
+A burst of bcrypt verifications used to run on the event loop and stall every socket in
+the process; the ping round-trips show whether the loop stays responsive. Start the app
+(``uvicorn app.main:app``), then run::
+
+    python -m benchmarks.login_throughput --base-url http://127.0.0.1:8000 --workers 64 --sockets 50
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+import websockets
+
+from .harness import PASSWORD, seed_user, summarize
+
+
+async def pinger(url: str, interval: float, samples: list[float], stop: asyncio.Event) -> None:
+    async with websockets.connect(url) as socket:
+        while not stop.is_set():
+            started = time.perf_counter()
+            pong = await socket.ping()
+            await pong
+            samples.append(time.perf_counter() - started)
+            await asyncio.sleep(interval)
+
+
+async def login_worker(
+    client: httpx.AsyncClient, email: str, deadline: float, latencies: list[float], statuses: dict[int, int]
+) -> None:
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def run(args: argparse.Namespace) -> dict:
+    limits = httpx.Limits(max_connections=args.workers * 2)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        user = await seed_user(client, 0)
+        ws_url = args.base_url.replace("http", "ws", 1) + f"/public/ws/{user.slug}"
+        stop = asyncio.Event()
+
+        idle_pings: list[float] = []
+        pingers = [asyncio.create_task(pinger(ws_url, args.ping_interval, idle_pings, stop)) for _ in range(args.sockets)]
+        await asyncio.sleep(2)
+        stop.set()
+        await asyncio.gather(*pingers, return_exceptions=True)
+
+        stop = asyncio.Event()
+        loaded_pings: list[float] = []
+        pingers = [
+            asyncio.create_task(pinger(ws_url, args.ping_interval, loaded_pings, stop)) for _ in range(args.sockets)
+        ]
+        latencies: list[float] = []
+        statuses: dict[int, int] = {}
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(login_worker(client, user.email, deadline, latencies, statuses) for _ in range(args.workers)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*pingers, return_exceptions=True)
+
+    return {
+        "base_url": args.base_url,
+        "workers": args.workers,
+        "sockets": args.sockets,
+        "duration_s": round(elapsed, 3),
+        "logins_per_s": round(statuses.get(200, 0) / elapsed, 1),
+        "statuses": statuses,
+        "login": summarize(latencies),
+        "ws_ping_idle": summarize(idle_pings),
+        "ws_ping_under_load": summarize(loaded_pings),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--sockets", type=int, default=50)
+    parser.add_argument("--ping-interval", type=float, default=0.05)
+    parser.add_argument("--duration", type=float, default=20.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Check that idle WebSockets hold no pooled database connections.
+
+Starts the server like ``load_suite`` does, opens ``--sockets`` connections split between
+``/ws/user?token=`` and ``/public/ws/{slug}``, then reads ``todo_sync_db_pool_connections``
+from ``/metrics`` and times a REST request while every socket is still open::
+
+    python -m benchmarks.ws_pool_usage --sockets 10000
+    python -m benchmarks.ws_pool_usage --database-url mysql+pymysql://u:p@127.0.0.1/todo_bench
+
+Exits non-zero if any connection is checked out while the sockets are idle. The server and
+this client each need a file-descriptor limit above ``--sockets`` (``ulimit -n``).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from contextlib import AsyncExitStack
+
+import httpx
+import websockets
+
+from .harness import METRICS_TOKEN, free_port, seed_user, start_server, wait_ready
+
+
+def pool_state(metrics_text: str) -> dict[str, float]:
+    state = {}
+    for line in metrics_text.splitlines():
+        if line.startswith("todo_sync_db_pool_connections{"):
+            labels, _, value = line.partition("} ")
+            state[labels.split('"')[1]] = float(value)
+    return state
+
+
+async def open_sockets(stack: AsyncExitStack, urls: list[str], concurrency: int) -> int:
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def connect(url: str) -> None:
+        nonlocal failures
+        async with semaphore:
+            try:
+                await stack.enter_async_context(websockets.connect(url, open_timeout=30, ping_interval=None))
+            except (OSError, asyncio.TimeoutError, websockets.WebSocketException):
+                failures += 1
+
+    await asyncio.gather(*(connect(url) for url in urls))
+    return failures
+
+
+async def run(args: argparse.Namespace) -> dict:
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='todo-sync-ws-')}/bench.db"
+    port = free_port()
+    server = start_server(database_url, port)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client, AsyncExitStack() as stack:
+            await wait_ready(client)
+            # Spread over several users so no channel hits ws_max_connections_per_channel.
+            users = [await seed_user(client, 10) for _ in range(args.users)]
+            ws_base = base_url.replace("http", "ws", 1)
+            urls = []
+            for index in range(args.sockets):
+                user = users[index // 2 % len(users)]
+                if index % 2:
+                    urls.append(f"{ws_base}/public/ws/{user.slug}")
+                else:
+                    urls.append(f"{ws_base}/ws/user?token={user.token}")
+
+            started = time.perf_counter()
+            failures = await open_sockets(stack, urls, args.concurrency)
+            connect_seconds = time.perf_counter() - started
+            await asyncio.sleep(args.settle)
+
+            metrics = await client.get("/metrics", headers={"Authorization": f"Bearer {METRICS_TOKEN}"})
+            pool = pool_state(metrics.text)
+            started = time.perf_counter()
+            response = await client.get("/todos", params={"date": time.strftime("%Y-%m-%d")}, headers=user.headers)
+            rest_ms = (time.perf_counter() - started) * 1000
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    return {
+        "database": database_url.split("://", 1)[0],
+        "sockets_requested": args.sockets,
+        "sockets_open": args.sockets - failures,
+        "connect_seconds": round(connect_seconds, 3),
+        "pool": pool,
+        "rest_status": response.status_code,
+        "rest_ms": round(rest_ms, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="database for the spawned server (default: temporary SQLite)")
+    parser.add_argument("--sockets", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=20, help="users the sockets are spread over")
+    parser.add_argument("--concurrency", type=int, default=200, help="handshakes in flight at once")
+    parser.add_argument("--settle", type=float, default=1.0, help="seconds to wait before sampling the pool")
+    args = parser.parse_args()
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    if result["pool"].get("checkedout", 0) > 0 or result["sockets_open"] < args.sockets:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
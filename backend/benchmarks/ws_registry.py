@@ -0,0 +1,137 @@
+"""Connection-registry cost with many registered sockets: churn and broadcast.
+
+Registers ``--sockets`` in-process sockets (no network). Each is opened on a ``user:``
+channel and also subscribes to a ``calendar:`` channel and a shared hot channel. It then
+measures connect/disconnect churn, fan-out to the hot channel, and a two-channel publish
+that reaches every socket once. ``list_remove_us`` times ``list.remove`` on a list the
+size of the hot channel, which is what the old list-based registry paid per disconnect::
+
+    python -m benchmarks.ws_registry --sockets 100000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from app.events.backends import BroadcastBackend
+from app.events.bus import WebSocketManager
+from app.events.envelope import EventEnvelope
+
+
+class NullWebSocket:
+    sent = 0
+
+    async def accept(self) -> None:
+        return None
+
+    async def send_text(self, text: str) -> None:
+        NullWebSocket.sent += 1
+
+    async def close(self, code: int = 1000) -> None:
+        return None
+
+
+async def register(manager: WebSocketManager, index: int, args: argparse.Namespace):
+    connection = await manager.connect(NullWebSocket(), f"user:{index % args.users}")
+    manager.subscribe(connection, f"calendar:{index % args.calendars}")
+    manager.subscribe(connection, "calendar:hot")
+    return connection
+
+
+async def drain() -> None:
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def list_remove_us(size: int, ops: int) -> float:
+    members = list(range(size))
+    started = time.perf_counter()
+    for _ in range(ops):
+        value = random.randrange(size)
+        members.remove(value)
+        members.append(value)
+    return (time.perf_counter() - started) / ops * 1e6
+
+
+async def run(args: argparse.Namespace) -> dict:
+    manager = WebSocketManager(
+        backend=BroadcastBackend(),
+        queue_size=args.queue_size,
+        max_connections=args.sockets * 2,
+        max_channel_connections=args.sockets * 2,
+    )
+    started = time.perf_counter()
+    connections = [await register(manager, index, args) for index in range(args.sockets)]
+    register_seconds = time.perf_counter() - started
+
+    churn = []
+    for step in range(args.churn):
+        index = random.randrange(len(connections))
+        started = time.perf_counter()
+        manager.drop_connection(connections[index])
+        connections[index] = await register(manager, args.sockets + step, args)
+        churn.append(time.perf_counter() - started)
+        if step % 1000 == 0:
+            await drain()
+    await drain()
+
+    event = EventEnvelope("todo_toggled", {"id": 1, "version": 1})
+    hot = []
+    for _ in range(args.broadcasts):
+        started = time.perf_counter()
+        await manager.broadcast("calendar:hot", event)
+        hot.append(time.perf_counter() - started)
+        await drain()
+
+    # A public toggle targets calendar:<slug> and user:<id>; sockets on both get it once.
+    NullWebSocket.sent = 0
+    started = time.perf_counter()
+    await manager.publish(["calendar:0", "user:0"], event)
+    publish_seconds = time.perf_counter() - started
+    await drain()
+    # Churn can empty either channel, and the registry drops empty channels.
+    calendar, user = manager.connections.get("calendar:0", set()), manager.connections.get("user:0", set())
+    overlapping = len(calendar | user)
+    naive = len(calendar) + len(user)
+
+    return {
+        "sockets": manager.connection_count,
+        "subscriptions": sum(len(members) for members in manager.connections.values()),
+        "register_us_per_socket": round(register_seconds / args.sockets * 1e6, 3),
+        "churn_us": {
+            "mean": round(statistics.fmean(churn) * 1e6, 3),
+            "p99": round(sorted(churn)[int(len(churn) * 0.99)] * 1e6, 3),
+        },
+        "list_remove_us": round(list_remove_us(args.sockets, min(args.churn, 2000)), 3),
+        "hot_broadcast_ms": {
+            "members": len(manager.connections["calendar:hot"]),
+            "mean": round(statistics.fmean(hot) * 1000, 3),
+            "max": round(max(hot) * 1000, 3),
+        },
+        "two_channel_publish": {
+            "ms": round(publish_seconds * 1000, 3),
+            "frames_sent": NullWebSocket.sent,
+            "distinct_sockets": overlapping,
+            "without_dedupe": naive,
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sockets", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1000, help="distinct user: channels")
+    parser.add_argument("--calendars", type=int, default=1000, help="distinct calendar: channels")
+    parser.add_argument("--churn", type=int, default=10_000, help="disconnect + reconnect pairs")
+    parser.add_argument("--broadcasts", type=int, default=10)
+    parser.add_argument("--queue-size", type=int, default=256)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
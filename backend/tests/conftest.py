@@ -0,0 +1,39 @@
+"""Settings are read when app modules are imported, so the environment is set here first."""
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import uuid
+
+import pytest
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='todo-sync-tests-')}/tests.db")
+os.environ.setdefault("JWT_SECRET", "tests")
+os.environ.setdefault("PASSWORD_HASH_ROUNDS", "4")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app.db.init_db import create_all
+    from app.main import app
+
+    asyncio.run(create_all())
+    return app
+
+
+@pytest.fixture
+def client(app):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def auth_headers(client):
+    email = f"user-{uuid.uuid4().hex[:12]}@example.com"
+    client.post("/auth/register", json={"email": email, "password": "password", "name": None})
+    token = client.post("/auth/login", data={"username": email, "password": "password"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
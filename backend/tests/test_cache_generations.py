@@ -0,0 +1,42 @@
+"""A cache fill whose read overlapped an invalidation of the same user is not stored."""
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from app.core.cache import LRUCache
+from app.core.config import get_settings
+from app.events.envelope import ACCOUNT_UPDATED
+from app.models.user import ShareMode
+from app.services.public_cache import PublicCalendarCache
+
+
+def test_set_after_invalidation_of_its_tag_is_dropped():
+    cache: LRUCache[str] = LRUCache(10, 60)
+    generation = cache.generation
+    cache.invalidate_tag(1)
+    assert cache.set("a", "stale", tag=1, generation=generation) is False
+    assert cache.get("a") is None
+    assert cache.stats.stale_rejections == 1
+    # Other tags, and fills that started after the invalidation, are unaffected.
+    assert cache.set("b", "fresh", tag=2, generation=generation) is True
+    assert cache.set("a", "fresh", tag=1, generation=cache.generation) is True
+
+
+class InvalidatingSession:
+    """Returns the pre-update row, with the update's account_updated landing mid-read."""
+
+    def __init__(self, cache: PublicCalendarCache, user: SimpleNamespace) -> None:
+        self.cache, self.user = cache, user
+
+    async def execute(self, statement):
+        self.cache.on_event(f"user:{self.user.id}", {"type": ACCOUNT_UPDATED, "payload": {"user_id": self.user.id}})
+        return SimpleNamespace(scalar_one_or_none=lambda: self.user)
+
+
+def test_calendar_read_overlapping_account_update_is_not_cached():
+    cache = PublicCalendarCache(get_settings())
+    user = SimpleNamespace(id=7, share_mode=ShareMode.PUBLIC_EDIT, edit_token="old")
+    calendar = asyncio.run(cache.get_calendar(InvalidatingSession(cache, user), "team"))
+    assert calendar.edit_token == "old"
+    assert cache.calendars.get("team") is None
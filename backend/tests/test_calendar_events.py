@@ -0,0 +1,20 @@
+"""Owner edits reach public calendar subscribers, so their seq has no structural gaps."""
+from __future__ import annotations
+
+import json
+import uuid
+
+
+def test_owner_edits_are_published_on_the_shared_calendar(client, auth_headers):
+    slug = f"calendar-{uuid.uuid4().hex[:8]}"
+    client.put("/sharing", json={"share_mode": "public_view", "public_slug": slug, "edit_token": None}, headers=auth_headers)
+
+    with client.websocket_connect(f"/public/ws/{slug}") as ws:
+        created = client.post(
+            "/todos", json={"title": "t", "description": None, "todo_date": "2025-11-06"}, headers=auth_headers
+        ).json()
+        toggled = client.post(f"/todos/{created['id']}/toggle", headers=auth_headers).json()
+        events = [json.loads(ws.receive_text()) for _ in range(2)]
+
+    assert [event["payload"]["id"] for event in events] == [created["id"], toggled["id"]]
+    assert events[1]["seq"] == events[0]["seq"] + 1
@@ -0,0 +1,14 @@
+"""Parallel toggles on one todo all land: none fail and none overwrite another."""
+from __future__ import annotations
+
+import asyncio
+
+from benchmarks.concurrent_toggles import run
+
+
+def test_concurrent_toggles_on_one_todo_lose_no_updates(app):
+    result = asyncio.run(run(toggles=60, concurrency=12))
+    assert result["failed"] == 0
+    assert result["lost_updates"] == 0
+    assert result["final_version"] == 61
+    assert result["status_consistent"]
@@ -0,0 +1,20 @@
+"""/metrics fails closed without a token and types running totals as counters."""
+from __future__ import annotations
+
+from app.api import metrics
+
+
+def test_metrics_is_not_served_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(metrics.settings, "metrics_token", None)
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_requires_the_configured_token(client, monkeypatch):
+    monkeypatch.setattr(metrics.settings, "metrics_token", "scrape")
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    body = client.get("/metrics", headers={"Authorization": "Bearer scrape"}).text
+    assert "# TYPE todo_sync_ws_messages_total counter" in body
+    assert "# TYPE todo_sync_outbox_events_total counter" in body
+    assert "# TYPE todo_sync_outbox gauge" in body
+    assert 'todo_sync_outbox_events_total{field="pending"}' not in body
@@ -0,0 +1,26 @@
+"""Deactivating an account evicts its cached principals once the change commits."""
+from __future__ import annotations
+
+import asyncio
+
+from app.core.db import session_scope
+from app.models.user import User
+from app.services.auth import AuthService
+from app.services.principal_cache import principal_cache
+
+
+async def deactivate(user_id: int) -> None:
+    async with session_scope() as session:
+        await AuthService(session).set_active(await session.get(User, user_id), False)
+
+
+def test_deactivated_user_is_rejected_despite_a_cached_principal(client, auth_headers):
+    user_id = client.get("/auth/me", headers=auth_headers).json()["id"]
+    assert client.get("/todos", params={"date": "2025-11-06"}, headers=auth_headers).status_code == 200
+    hits = principal_cache.stats.cache_hits
+    assert client.get("/todos", params={"date": "2025-11-06"}, headers=auth_headers).status_code == 200
+    assert principal_cache.stats.cache_hits == hits + 1
+
+    asyncio.run(deactivate(user_id))
+
+    assert client.get("/todos", params={"date": "2025-11-06"}, headers=auth_headers).status_code == 401
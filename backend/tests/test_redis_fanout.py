@@ -0,0 +1,96 @@
+"""Two app instances sharing one Redis: a toggle on A reaches a socket on B exactly once.
+
+Both instances run as real uvicorn processes against one SQLite file, with an
+in-process fakeredis TCP server standing in for Redis.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import pytest
+from fakeredis import TcpFakeServer
+from websockets.sync.client import connect
+
+from benchmarks.harness import free_port, start_server, wait_ready
+
+
+@pytest.fixture
+def redis_url():
+    port = free_port()
+    server = TcpFakeServer(("127.0.0.1", port))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{port}/0"
+    server.shutdown()
+    server.server_close()
+
+
+async def wait_all_ready(urls: list[str]) -> None:
+    for url in urls:
+        async with httpx.AsyncClient(base_url=url) as client:
+            await wait_ready(client)
+
+
+@pytest.fixture
+def instances(tmp_path, redis_url):
+    database_url = f"sqlite:///{tmp_path / 'fanout.db'}"
+    servers, urls = [], []
+    try:
+        for _ in range(2):
+            port = free_port()
+            servers.append(start_server(database_url, port, REDIS_URL=redis_url, JWT_SECRET="fanout-secret"))
+            urls.append(f"http://127.0.0.1:{port}")
+        asyncio.run(wait_all_ready(urls))
+        yield urls
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait(timeout=10)
+
+
+def receive_events(ws, seconds: float) -> list[dict]:
+    events, deadline = [], time.monotonic() + seconds
+    while (remaining := deadline - time.monotonic()) > 0:
+        try:
+            message = json.loads(ws.recv(timeout=remaining))
+        except TimeoutError:
+            break
+        events.extend(message["payload"]["events"] if message["type"] == "batch" else [message])
+    return events
+
+
+def test_toggle_on_one_instance_reaches_socket_on_other_once(instances):
+    a, b = (httpx.Client(base_url=url) for url in instances)
+    a.post("/auth/register", json={"email": "fanout@example.com", "password": "fanout-pw", "name": None})
+    token = a.post("/auth/login", data={"username": "fanout@example.com", "password": "fanout-pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    a.put("/sharing", json={"share_mode": "public_edit", "public_slug": "fanout", "edit_token": "edit"}, headers=headers)
+    ws_url = instances[1].replace("http", "ws", 1)
+
+    # The socket on B follows both channels a public toggle targets: user:<id> and calendar:<slug>.
+    with connect(f"{ws_url}/ws/user?token={token}") as ws:
+        ws.send(json.dumps({"type": "subscribe", "channels": ["calendar:fanout"]}))
+        assert json.loads(ws.recv(timeout=5))["type"] == "subscribed"
+
+        # B's Redis subscription starts in the background; wait until A's events arrive.
+        todo_id = None
+        for _ in range(50):
+            created = a.post("/todos", json={"title": "t", "description": None, "todo_date": "2025-11-06"}, headers=headers)
+            if any(event["type"] == "todo_created" for event in receive_events(ws, 0.2)):
+                todo_id = created.json()["id"]
+                break
+        assert todo_id is not None, "instance B never received events from instance A"
+        receive_events(ws, 0.5)
+
+        toggled = a.post(f"/public/fanout/todos/{todo_id}/toggle", params={"edit_token": "edit"})
+        assert toggled.status_code == 200
+        version = toggled.json()["version"]
+
+        events = receive_events(ws, 1.5)
+        matching = [event for event in events if event["payload"].get("id") == todo_id]
+        assert len(matching) == 1, events
+        assert matching[0]["payload"]["version"] == version
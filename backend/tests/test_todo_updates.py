@@ -0,0 +1,36 @@
+"""Partial updates: omitted fields are left alone, explicit nulls on NOT NULL columns are rejected."""
+from __future__ import annotations
+
+
+def create_todo(client, headers) -> dict:
+    response = client.post(
+        "/todos", json={"title": "before", "description": "kept", "todo_date": "2025-11-06"}, headers=headers
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_patch_with_only_title_leaves_other_fields(client, auth_headers):
+    todo = create_todo(client, auth_headers)
+    response = client.patch(f"/todos/{todo['id']}", json={"title": "after", "version": todo["version"]}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    updated = response.json()
+    assert updated["title"] == "after"
+    assert updated["description"] == "kept"
+    assert updated["status"] == todo["status"]
+    assert updated["version"] == todo["version"] + 1
+
+
+def test_batch_update_with_only_title(client, auth_headers):
+    todo = create_todo(client, auth_headers)
+    operation = {"op": "update", "id": todo["id"], "version": todo["version"], "title": "batched"}
+    response = client.post("/todos/batch", json={"operations": [operation]}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["results"][0]["todo"]["title"] == "batched"
+
+
+def test_patch_rejects_null_status(client, auth_headers):
+    todo = create_todo(client, auth_headers)
+    response = client.patch(f"/todos/{todo['id']}", json={"status": None, "version": todo["version"]}, headers=auth_headers)
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][-1] == "status"
@@ -0,0 +1,61 @@
+"""App-level heartbeat eviction applies only to sockets that answer pings with pongs."""
+from __future__ import annotations
+
+import asyncio
+import json
+
+from fastapi import WebSocketDisconnect
+
+from app.events.backends import BroadcastBackend
+from app.events.bus import WebSocketManager
+
+INTERVAL, TIMEOUT = 0.05, 0.15
+
+
+class ScriptedWebSocket:
+    def __init__(self, *frames: str) -> None:
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        for frame in frames:
+            self.inbox.put_nowait(frame)
+        self.closed_with = None
+
+    async def accept(self) -> None:
+        return None
+
+    async def send_text(self, text: str) -> None:
+        return None
+
+    async def receive_text(self) -> str:
+        frame = await self.inbox.get()
+        if frame is None:
+            raise WebSocketDisconnect()
+        return frame
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed_with = code
+        self.inbox.put_nowait(None)
+
+
+async def serve_silently(*frames: str) -> int | None:
+    manager = WebSocketManager(backend=BroadcastBackend(), heartbeat_interval=INTERVAL, heartbeat_timeout=TIMEOUT)
+    await manager.start()
+    websocket = ScriptedWebSocket(*frames)
+
+    async def on_message(connection, text: str) -> None:
+        manager.subscribe(connection, "calendar:team")
+
+    task = asyncio.create_task(manager.serve(websocket, "user:1", on_message))
+    await asyncio.sleep(TIMEOUT * 5)
+    closed_with = websocket.closed_with
+    task.cancel()
+    await manager.stop()
+    return closed_with
+
+
+def test_socket_that_subscribes_then_listens_is_not_evicted():
+    subscribe = json.dumps({"type": "subscribe", "channels": ["calendar:team"]})
+    assert asyncio.run(serve_silently(subscribe)) is None
+
+
+def test_socket_that_stops_ponging_is_evicted():
+    assert asyncio.run(serve_silently(json.dumps({"type": "pong"}))) == 1001